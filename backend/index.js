@@ -1,5 +1,9 @@
 import express from 'express';
 import dotenv from 'dotenv';
+import path from 'path';
+import readline from 'readline';
+import { spawn } from 'child_process';
+import { fileURLToPath } from 'url';
 import { connectDB } from './config/db.js';
 import userRoutes from './routes/user.routes.js';
 import userQuestionsRoutes from './routes/userQuestions.routes.js';
@@ -10,6 +14,107 @@ dotenv.config();
 
 const app = express();
 
+const __dirname = path.dirname(fileURLToPath(import.meta.url));
+const mlModelsDir = path.join(__dirname, '..', 'ml_models');
+const ML_PREDICTION_TIMEOUT_MS = 15000;
+
+// Long-lived ML worker: loads the model once and answers JSONL requests on stdin/stdout.
+// Each worker keeps its own pending requests, so a replaced worker's late
+// events never touch the requests sent to its successor
+let riskWorker = null;
+let nextRiskRequestId = 1;
+
+const rejectPendingRiskRequests = (worker, error) => {
+  for (const pending of worker.pending.values()) {
+    clearTimeout(pending.timer);
+    pending.reject(error);
+  }
+  worker.pending.clear();
+};
+
+// Drop a worker that can no longer take requests and fail what it was answering
+const failRiskWorker = (worker, error) => {
+  if (riskWorker === worker) {
+    riskWorker = null;
+  }
+  rejectPendingRiskRequests(worker, error);
+};
+
+const startRiskWorker = () => {
+  const pythonScriptPath = path.join(mlModelsDir, 'predict_survey_risk.py');
+  console.log('Starting ML worker:', pythonScriptPath);
+
+  const worker = spawn('python', [pythonScriptPath, '--serve'], { cwd: mlModelsDir });
+  worker.pending = new Map();
+
+  readline.createInterface({ input: worker.stdout }).on('line', (line) => {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (parseError) {
+      console.error('Failed to parse ML worker output:', line);
+      return;
+    }
+
+    const pending = worker.pending.get(message.id);
+    if (!pending) {
+      return;
+    }
+    worker.pending.delete(message.id);
+    clearTimeout(pending.timer);
+
+    if (message.error) {
+      pending.reject(new Error(message.error));
+    } else {
+      pending.resolve(message.result);
+    }
+  });
+
+  worker.stderr.on('data', (data) => {
+    console.error('ML worker:', data.toString().trim());
+  });
+
+  worker.on('error', (err) => {
+    console.error('Failed to start ML worker:', err);
+    failRiskWorker(worker, new Error('ML worker failed to start'));
+  });
+
+  // Writing to a worker that died (EPIPE) emits 'error' on stdin; unhandled,
+  // it would crash the whole server instead of failing the pending requests
+  worker.stdin.on('error', (err) => {
+    console.error('ML worker stdin error:', err.message);
+    failRiskWorker(worker, new Error('ML worker is not available'));
+  });
+
+  worker.on('close', (code) => {
+    console.error('ML worker exited with code:', code);
+    failRiskWorker(worker, new Error('ML worker exited'));
+  });
+
+  riskWorker = worker;
+};
+
+const predictRiskWithWorker = (surveyResponses) => new Promise((resolve, reject) => {
+  if (!riskWorker || !riskWorker.stdin.writable) {
+    startRiskWorker();
+  }
+
+  const worker = riskWorker;
+  const id = nextRiskRequestId++;
+  const timer = setTimeout(() => {
+    worker.pending.delete(id);
+    reject(new Error('ML prediction timeout'));
+    // A worker that stops answering is hung: replace it so later requests
+    // do not all wait out the timeout too
+    console.error('ML worker timed out, restarting it');
+    failRiskWorker(worker, new Error('ML worker timed out'));
+    worker.kill();
+  }, ML_PREDICTION_TIMEOUT_MS);
+
+  worker.pending.set(id, { resolve, reject, timer });
+  worker.stdin.write(JSON.stringify({ id, survey: surveyResponses }) + '\n');
+});
+
 app.use(express.json());
 
 // Test route
@@ -46,80 +151,26 @@ app.post('/api/risk/predict', async (req, res) => {
 
     console.log('Survey-based ML Risk Prediction Request:', surveyResponses);
 
-    // Call Python ML model with survey responses
-    const { spawn } = require('child_process');
-    const path = require('path');
-
-    const pythonScriptPath = path.join(__dirname, '..', 'ml_models', 'predict_survey_risk.py');
-    const surveyDataJson = JSON.stringify(surveyResponses);
-
-    console.log('Calling Python script:', pythonScriptPath);
-    console.log('With data:', surveyDataJson);
-    console.log('Working directory:', process.cwd());
-
-    const pythonProcess = spawn('python', [pythonScriptPath, surveyDataJson], {
-      timeout: 15000 // 15 second timeout
-    });
-
-    let result = '';
-    let error = '';
+    // Send survey responses to the long-lived Python ML worker
+    try {
+      const prediction = await predictRiskWithWorker(surveyResponses);
+      console.log('ML Prediction Result:', prediction);
 
-    pythonProcess.stdout.on('data', (data) => {
-      result += data.toString();
-    });
-
-    pythonProcess.stderr.on('data', (data) => {
-      error += data.toString();
-    });
-
-    pythonProcess.on('close', (code) => {
-      if (code === 0) {
-        try {
-          const prediction = JSON.parse(result.trim());
-          console.log('ML Prediction Result:', prediction);
-
-          res.json({
-            success: true,
-            prediction: prediction,
-            method: 'survey_based_ml',
-            timestamp: new Date().toISOString()
-          });
-        } catch (parseError) {
-          console.error('Failed to parse ML result:', parseError);
-          console.error('Raw result:', result);
-          res.status(500).json({
-            success: false,
-            error: 'Failed to parse ML prediction result'
-          });
-        }
-      } else {
-        console.error('Python script failed with code:', code);
-        console.error('Error output:', error);
-        res.status(500).json({
-          success: false,
-          error: 'ML prediction failed'
-        });
-      }
-    });
-
-    pythonProcess.on('error', (err) => {
-      console.error('Failed to start Python process:', err);
+      res.json({
+        success: true,
+        prediction: prediction,
+        method: 'survey_based_ml',
+        timestamp: new Date().toISOString()
+      });
+    } catch (predictionError) {
+      console.error('ML prediction failed:', predictionError.message);
       res.status(500).json({
         success: false,
-        error: 'Failed to start ML prediction process'
+        error: predictionError.message === 'ML prediction timeout'
+          ? 'ML prediction timeout'
+          : 'ML prediction failed'
       });
-    });
-
-    // Add timeout
-    setTimeout(() => {
-      pythonProcess.kill();
-      if (!res.headersSent) {
-        res.status(500).json({
-          success: false,
-          error: 'ML prediction timeout'
-        });
-      }
-    }, 15000);
+    }
 
   } catch (error) {
     console.error('Risk prediction error:', error);
@@ -144,5 +195,6 @@ const PORT = process.env.PORT || 5000;
 
 app.listen(PORT, () => {
   connectDB();
+  startRiskWorker();
   console.log(`Server is running on port http://localhost:${PORT}`);
 });
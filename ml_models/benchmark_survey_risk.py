@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the survey risk pipeline
+Usage: python benchmark_survey_risk.py [--quick] [--tolerance 0.2] [--update-baseline]
+
+Measures cold-start latency of predict_survey_risk.py, warm single-prediction
+latency per model, batch throughput at several batch sizes, dataset
+generation rows/sec and train_models wall time as n_samples grows.
+
+Every run is appended to benchmark_history.jsonl and compared against
+benchmark_baseline.json (both next to this script); the exit code is 1 when any metric is worse than the
+baseline by more than the tolerance.
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import statistics
+import warnings
+warnings.filterwarnings('ignore')
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_PATH = os.path.join(MODULE_DIR, 'benchmark_history.jsonl')
+BASELINE_PATH = os.path.join(MODULE_DIR, 'benchmark_baseline.json')
+DEFAULT_TOLERANCE = 0.2
+
+SAMPLE_SURVEY = {
+    'risk': 'High',
+    'goal': 'Wealth Growth',
+    'investmentDuration': 'Long-term (7+ years)',
+    'experience': 'Advanced'
+}
+
+def median_seconds(function, repeats, warmup=1):
+    """Median wall time of function() over repeats runs"""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def metric(value, unit, better):
+    return {'value': value, 'unit': unit, 'better': better}
+
+def bench_cold_start(repeats):
+    """Wall time of one-shot predict_survey_risk.py processes"""
+    script = os.path.join(MODULE_DIR, 'predict_survey_risk.py')
+    survey_json = json.dumps(SAMPLE_SURVEY)
+    metrics = {}
+    for name, extra_args in (('table', []), ('cascade', ['--cascade'])):
+        command = [sys.executable, script] + extra_args + [survey_json]
+        run = lambda: subprocess.run(command, cwd=MODULE_DIR, capture_output=True, check=True)
+        metrics[f'cold_start.{name}_ms'] = metric(median_seconds(run, repeats) * 1000, 'ms', 'lower')
+
+    from predict_survey_risk import measure_startup
+    metrics['cold_start.import_ms'] = metric(measure_startup()['import_ms'], 'ms', 'lower')
+    return metrics
+
+def bench_warm(repeats):
+    """Single-survey latency per model and per prediction path with models loaded"""
+    import predict_survey_risk as predictor
+
+    model_data = predictor.load_model_data()
+    answer_table = predictor.load_answer_table()
+    row = predictor.encode_survey(SAMPLE_SURVEY, model_data)
+    metrics = {}
+    for name, model in model_data['all_models'].items():
+        seconds = median_seconds(lambda: (model.predict(row), model.predict_proba(row)), repeats)
+        metrics[f'warm.{name}_ms'] = metric(seconds * 1000, 'ms', 'lower')
+
+    seconds = median_seconds(lambda: predictor.predict_with_models(SAMPLE_SURVEY, model_data), repeats)
+    metrics['warm.ensemble_ms'] = metric(seconds * 1000, 'ms', 'lower')
+    seconds = median_seconds(lambda: predictor.predict_with_cascade(SAMPLE_SURVEY, model_data), repeats)
+    metrics['warm.cascade_ms'] = metric(seconds * 1000, 'ms', 'lower')
+    if answer_table is not None:
+        seconds = median_seconds(lambda: predictor.lookup_answer_table(answer_table, SAMPLE_SURVEY), repeats * 100)
+        metrics['warm.table_us'] = metric(seconds * 1e6, 'us', 'lower')
+    return metrics
+
+def bench_batch(batch_sizes, repeats):
+    """predict_risk_batch throughput over realistic generated surveys"""
+    import predict_survey_risk as predictor
+    from survey_risk_model import iter_survey_dataset
+
+    model_data = predictor.load_model_data()
+    df = next(iter_survey_dataset(max(batch_sizes), seed=7))
+    surveys = df[model_data['feature_columns']].astype(str).to_dict('records')
+    metrics = {}
+    for size in batch_sizes:
+        batch = surveys[:size]
+        seconds = median_seconds(lambda: predictor.predict_risk_batch(batch, model_data), repeats)
+        metrics[f'batch.rows_per_sec@{size}'] = metric(size / seconds, 'rows/s', 'higher')
+    return metrics
+
+def bench_dataset(sizes, repeats):
+    """create_survey_dataset rows/sec, quality-check report included"""
+    from survey_risk_model import create_survey_dataset
+
+    metrics = {}
+    for size in sizes:
+        def generate():
+            with contextlib.redirect_stdout(io.StringIO()):
+                create_survey_dataset(size)
+        seconds = median_seconds(generate, repeats, warmup=0)
+        metrics[f'dataset.rows_per_sec@{size}'] = metric(size / seconds, 'rows/s', 'higher')
+    return metrics
+
+def bench_training(sizes, n_workers):
+    """train_models wall time, with MODEL_DIR pointed at a scratch directory so artifacts stay untouched"""
+    metrics = {}
+    for size in sizes:
+        # Artifact paths are fixed at import, so each run is its own process
+        code = (
+            "import io, time, contextlib\n"
+            "from survey_risk_model import train_models\n"
+            "started = time.perf_counter()\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            f"    train_models(n_samples={size}, n_workers={n_workers!r})\n"
+            "print(time.perf_counter() - started)\n"
+        )
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ, SURVEY_RISK_MODEL_DIR=scratch,
+                       SURVEY_RISK_DATASET_CACHE=os.path.join(scratch, '.dataset_cache'))
+            completed = subprocess.run([sys.executable, '-c', code], cwd=MODULE_DIR, env=env,
+                                       capture_output=True, text=True, check=True)
+        seconds = float(completed.stdout.strip().splitlines()[-1])
+        metrics[f'train.seconds@{size}'] = metric(seconds, 's', 'lower')
+    return metrics
+
+def run_benchmarks(quick=False, n_workers=None):
+    """Run every benchmark group and return the metrics dict"""
+    repeats = 5 if quick else 20
+    metrics = {}
+    groups = [
+        ('cold start', lambda: bench_cold_start(3 if quick else 10)),
+        ('warm prediction', lambda: bench_warm(repeats)),
+        ('batch throughput', lambda: bench_batch([1, 100, 10000] if quick else [1, 10, 100, 1000, 10000, 100000], 3 if quick else 5)),
+        ('dataset generation', lambda: bench_dataset([10000, 100000] if quick else [10000, 100000, 1000000], 1 if quick else 3)),
+        ('training', lambda: bench_training([500, 2000] if quick else [500, 2000, 8000], n_workers)),
+    ]
+    for label, bench in groups:
+        print(f"⏱  Benchmarking {label}...", file=sys.stderr)
+        metrics.update(bench())
+    return metrics
+
+def compare_to_baseline(metrics, baseline, tolerance):
+    """Return (name, baseline, current, change) for metrics worse than tolerance"""
+    regressions = []
+    for name, current in metrics.items():
+        previous = baseline.get('metrics', {}).get(name)
+        if previous is None or not previous['value']:
+            continue
+        change = (current['value'] - previous['value']) / previous['value']
+        worse = change > tolerance if current['better'] == 'lower' else change < -tolerance
+        if worse:
+            regressions.append((name, previous['value'], current['value'], change))
+    return regressions
+
+def git_commit():
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=MODULE_DIR,
+                                   capture_output=True, text=True, check=True)
+        return completed.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the survey risk pipeline")
+    parser.add_argument('--quick', action='store_true', help="fewer repeats and smaller sizes")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store this run as the new baseline")
+    parser.add_argument('--workers', type=int, default=None, help="train_models worker processes")
+    args = parser.parse_args()
+
+    os.chdir(MODULE_DIR)
+    run = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': args.quick,
+        'metrics': run_benchmarks(args.quick, args.workers)
+    }
+
+    with open(args.history, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+    print("\n📊 Benchmark Results:")
+    for name, result in run['metrics'].items():
+        print(f"  {name}: {result['value']:.3f} {result['unit']}")
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(run['metrics'], baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%} vs baseline:")
+        for name, previous, current, change in regressions:
+            print(f"  {name}: {previous:.3f} -> {current:.3f} ({change:+.1%})")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%} vs baseline")
+
+if __name__ == "__main__":
+    main()
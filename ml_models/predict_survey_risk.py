@@ -2,76 +2,656 @@
 """
 Predict risk level from survey responses
 Usage: python predict_survey_risk.py '{"risk": "High", "goal": "Wealth Growth", "investmentDuration": "Long-term (7+ years)", "experience": "Advanced"}'
+       python predict_survey_risk.py --serve
+       python predict_survey_risk.py --batch surveys.jsonl  (or surveys.csv)
+       python predict_survey_risk.py --compile-table | --verify-table
+       python predict_survey_risk.py --check-startup
+
+In --serve mode the model is loaded once and every stdin line is a request
+like {"id": 1, "survey": {...}}. Each request gets one stdout line
+{"id": 1, "result": {...}} (or {"id": 1, "error": "..."}), in input order.
+
+Known answer combinations are served from survey_risk_table.json, a table
+precompiled from the trained models, so most predictions never load sklearn.
+Other surveys use the NumPy-only array artifact (survey_risk_model.json, see
+survey_risk_arrays.py) when it exists, and the pickle otherwise. Once a
+model is published to the registry (survey_risk_registry.py), the current
+registry version and its table are served instead, loading each model only
+when a request needs it. Every result reports its 'model_version' (None
+for models from before the registry and for the rule-based fallback).
+--compile-table and --verify-table likewise work on the served table.
+Artifacts are found in MODEL_DIR whatever the working directory.
+
+--batch scores a whole file in chunks with one predict_proba per model per
+chunk and writes one {"id", "result"} JSON line per input row to stdout.
+
+Inference avoids pandas entirely and only imports numpy/sklearn when a model
+actually has to run; the rule-based fallback needs just the standard library.
+--check-startup enforces STARTUP_BUDGET_MS for a cold table prediction.
+
+--cascade (with a survey, --serve or --batch) skips the table and runs the
+models cheapest first, stopping once the confidence clears the threshold
+learned for that stage at training time; results report 'cascade_stage'.
+
+Predictions that load artifacts themselves go through ArtifactCache: the
+model and table stay in memory and are hot-reloaded in the background when
+a retrain replaces their files, so long-running importers never reload per
+call and never block on a reload.
+
+SURVEY_RISK_TIMINGS=field|stderr turns on per-stage timings (see
+survey_risk_timing.py): a 'timings' field on one-shot results and --serve
+responses, or JSON lines on stderr. --serve answers {"id": 1, "stats": true}
+with rolling p50/p95/p99 per stage.
 """
 
+import time
+_IMPORT_STARTED = time.perf_counter_ns()
+
 import sys
+import os
 import json
-import pandas as pd
+import hashlib
+import csv
+import itertools
 import pickle
+import threading
 import warnings
 warnings.filterwarnings('ignore')
 
-def predict_risk_from_survey(survey_data):
-    """Predict risk level from survey responses"""
-    try:
-        # Load trained model
-        with open('survey_risk_model.pkl', 'rb') as f:
-            model_data = pickle.load(f)
+import survey_risk_timing as timing
+from survey_risk_timing import timed
+from survey_risk_schema import CATEGORIES, CODES, CODE_DTYPE, encode_answers, matches_schema
+import survey_risk_registry as registry
+from survey_risk_registry import MODEL_DIR
+
+# Artifacts resolve against MODEL_DIR, never the working directory
+MODEL_PATH = os.path.join(MODEL_DIR, 'survey_risk_model.pkl')
+ARRAYS_MANIFEST_PATH = os.path.join(MODEL_DIR, 'survey_risk_model.json')
+TABLE_PATH = os.path.join(MODEL_DIR, 'survey_risk_table.json')
+TABLE_FORMAT_VERSION = 1
+BATCH_CHUNK_SIZE = 10000
+
+# How often a cached artifact stats its file for changes
+ARTIFACT_CHECK_INTERVAL = 1.0
+
+# Cold-start budget for importing this module and answering one survey from
+# the answer table, as measured by python -X importtime
+STARTUP_BUDGET_MS = 100
+HEAVY_MODULES = ('numpy', 'pandas', 'scipy', 'sklearn')
+
+def load_model_data(model_path=None):
+    """Load trained models and encoders, preferring the memory-mapped array artifact"""
+    if model_path is None:
+        model_path = default_model_path()
+    
+    with timed('load_model'):
+        if os.path.basename(model_path) == registry.CURRENT_NAME:
+            # Registry version: only the manifest now, each model on first use
+            return registry.load_version(registry_dir=os.path.dirname(model_path))
         
-        # Get all models and try each one
-        all_models = model_data['all_models']
-        encoders = model_data['encoders']
-        feature_columns = model_data['feature_columns']
+        if model_path.endswith('.json'):
+            # NumPy-only models; no sklearn import and no unpickling
+            from survey_risk_arrays import load_model_arrays
+            return load_model_arrays(model_path)
         
-        # Prepare input data
-        input_data = pd.DataFrame([survey_data])
+        # Unpickling also pays for the sklearn import
+        with open(model_path, 'rb') as f:
+            return pickle.load(f)
+
+def default_model_path():
+    """The registry's CURRENT pointer once a model is published, else the legacy artifacts"""
+    if os.path.exists(registry.current_path()):
+        return registry.current_path()
+    return ARRAYS_MANIFEST_PATH if os.path.exists(ARRAYS_MANIFEST_PATH) else MODEL_PATH
+
+def default_table_path():
+    return registry.table_path() or TABLE_PATH
+
+def file_signature(path):
+    """Cheap change detector for an artifact file"""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+class ArtifactCache:
+    """Keep a loaded artifact in memory and hot-reload it when its file changes
+    
+    The first get() loads synchronously. After that get() never blocks: at
+    most every check_interval seconds it stats the file, and a changed file
+    is loaded on a background thread and swapped in with a single
+    assignment, so callers keep the previous artifact until the new one is
+    complete. A file that was touched but whose content hash is unchanged is
+    not reloaded; a failed reload keeps the previous artifact.
+    """
+    
+    def __init__(self, loader, resolve_path, check_interval=ARTIFACT_CHECK_INTERVAL):
+        self.loader = loader
+        self.resolve_path = resolve_path
+        self.check_interval = check_interval
+        self.reloads = 0
+        # (path, signature, sha256 or None, artifact), replaced as a whole
+        self._current = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reloading = False
+    
+    def get(self):
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    path = self.resolve_path()
+                    # Hashing is left to the first reload to keep cold starts cheap
+                    self._current = (path, file_signature(path), None, self.loader(path))
+            return self._current[3]
         
-        # Encode features
-        input_encoded = input_data.copy()
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._check(current)
+        return current[3]
+    
+    def _check(self, current):
+        path = self.resolve_path()
+        try:
+            signature = file_signature(path)
+        except OSError:
+            # Mid-replace or deleted: keep serving what is loaded
+            return
+        if (path, signature) == current[:2]:
+            return
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, args=(path, signature), daemon=True).start()
+    
+    def _reload(self, path, signature):
+        try:
+            current = self._current
+            sha256 = file_sha256(path)
+            if current[0] == path and current[2] == sha256:
+                self._current = (path, signature, sha256, current[3])
+            else:
+                self._current = (path, signature, sha256, self.loader(path))
+                self.reloads += 1
+                print(f"Reloaded {os.path.basename(path)}", file=sys.stderr)
+        except Exception as e:
+            print(f"Reload of {os.path.basename(path)} failed, keeping the loaded version: {e}", file=sys.stderr)
+        finally:
+            self._reloading = False
+
+_artifact_caches = {}
+
+def cached_model_data(model_path=None):
+    """Model data from the shared in-memory cache, hot-reloaded on retrain"""
+    cache = _artifact_caches.get(('model', model_path))
+    if cache is None:
+        resolve_path = (lambda: model_path) if model_path else default_model_path
+        cache = _artifact_caches.setdefault(('model', model_path), ArtifactCache(load_model_data, resolve_path))
+    return cache.get()
+
+def cached_answer_table(table_path=None):
+    """Answer table from the shared in-memory cache, or None if there is none"""
+    cache = _artifact_caches.get(('table', table_path))
+    if cache is None:
+        resolve_path = (lambda: table_path) if table_path else default_table_path
+        cache = _artifact_caches.setdefault(('table', table_path), ArtifactCache(load_answer_table, resolve_path))
+    try:
+        return cache.get()
+    except FileNotFoundError:
+        return None
+
+def encoder_codes(model_data):
+    """Map each category of the saved LabelEncoders to its integer code"""
+    # Resolved once per loaded model so repeated predictions are plain dict
+    # hits; models saved with the schema codes share the schema's lookups
+    codes = model_data.get('encoder_codes')
+    if codes is None:
+        if matches_schema(model_data['encoders']):
+            codes = CODES
+        else:
+            codes = {
+                column: {str(value): code for code, value in enumerate(encoder.classes_)}
+                for column, encoder in model_data['encoders'].items()
+            }
+        model_data['encoder_codes'] = codes
+    return codes
+
+def encode_survey(survey_data, model_data):
+    """Encode one survey as a 1-row code matrix for the models"""
+    with timed('import_numpy'):
+        import numpy as np
+    
+    feature_columns = model_data['feature_columns']
+    missing_columns = [column for column in feature_columns if column not in survey_data]
+    if missing_columns:
+        raise KeyError(f"Survey is missing answers for {missing_columns}")
+    
+    # Encode features with plain dict lookups over the saved encoder classes
+    with timed('encode'):
+        codes = encoder_codes(model_data)
+        encoded_row = []
         for column in feature_columns:
-            if column in input_data.columns:
-                try:
-                    input_encoded[column] = encoders[column].transform(input_data[column])
-                except ValueError:
-                    # Handle unseen categories by using the most common encoded value
-                    input_encoded[column] = 0
-        
-        # Try all models and get the one with highest confidence
-        best_prediction = None
-        best_confidence = 0
-        best_model_name = None
-        
-        for model_name, model in all_models.items():
-            try:
-                # Make prediction
-                prediction = model.predict(input_encoded[feature_columns])[0]
-                probabilities = model.predict_proba(input_encoded[feature_columns])[0]
-                confidence = max(probabilities)
+            # Handle unseen categories by using the most common encoded value
+            encoded_row.append(codes[column].get(survey_data[column], 0))
+        return np.array([encoded_row], dtype=CODE_DTYPE)
+
+def predict_with_models(survey_data, model_data):
+    """Run every trained model on one survey and keep the most confident answer"""
+    # Get all models and try each one
+    all_models = model_data['all_models']
+    input_encoded = encode_survey(survey_data, model_data)
+    
+    # Try all models and get the one with highest confidence
+    best_prediction = None
+    best_confidence = 0
+    best_model_name = None
+    
+    for model_name, model in all_models.items():
+        try:
+            # Make prediction
+            with timed(f'model.{model_name}.predict'):
+                prediction = model.predict(input_encoded)[0]
+            with timed(f'model.{model_name}.predict_proba'):
+                probabilities = model.predict_proba(input_encoded)[0]
+            confidence = max(probabilities)
+            
+            # Keep track of best prediction
+            if confidence > best_confidence:
+                best_confidence = confidence
+                best_prediction = prediction
+                best_model_name = model_name
                 
-                # Keep track of best prediction
-                if confidence > best_confidence:
-                    best_confidence = confidence
-                    best_prediction = prediction
-                    best_model_name = model_name
-                    
-                    # Get class names and probabilities
-                    classes = model.classes_
-                    prob_dict = {classes[i]: probabilities[i] for i in range(len(classes))}
-                    
-            except Exception as e:
-                print(f"Error with model {model_name}: {e}", file=sys.stderr)
-                continue
+                # Get class names and probabilities
+                classes = model.classes_
+                prob_dict = {classes[i]: probabilities[i] for i in range(len(classes))}
+                
+        except Exception as e:
+            print(f"Error with model {model_name}: {e}", file=sys.stderr)
+            continue
+    
+    if best_prediction is None:
+        raise Exception("All models failed to make prediction")
+    
+    return {
+        'predicted_risk': best_prediction,
+        'confidence': best_confidence,
+        'probabilities': prob_dict,
+        'method': f'{best_model_name}_survey_ml',
+        'model_used': best_model_name,
+        'model_version': model_data.get('model_version')
+    }
+
+def cascade_plan(model_data, thresholds=None):
+    """Return the cascade stage order and per-stage exit thresholds"""
+    all_models = model_data['all_models']
+    cascade = model_data.get('cascade')
+    if cascade is None:
+        # Without learned metadata the cascade degrades to the full ensemble
+        print("No learned cascade in the model, running every model", file=sys.stderr)
+        return list(all_models), {}
+    
+    order = [name for name in cascade['order'] if name in all_models]
+    order += [name for name in all_models if name not in order]
+    return order, dict(cascade['thresholds'], **(thresholds or {}))
+
+def predict_with_cascade(survey_data, model_data, thresholds=None):
+    """Run models cheapest first and stop once the answer is confident enough"""
+    all_models = model_data['all_models']
+    model_rank = {name: rank for rank, name in enumerate(all_models)}
+    order, stage_thresholds = cascade_plan(model_data, thresholds)
+    input_encoded = encode_survey(survey_data, model_data)
+    
+    best = None
+    stages_run = 0
+    for model_name in order:
+        model = all_models[model_name]
+        try:
+            with timed(f'model.{model_name}.predict'):
+                prediction = model.predict(input_encoded)[0]
+            with timed(f'model.{model_name}.predict_proba'):
+                probabilities = model.predict_proba(input_encoded)[0]
+        except Exception as e:
+            print(f"Error with model {model_name}: {e}", file=sys.stderr)
+            continue
+        stages_run += 1
+        confidence = max(probabilities)
+        
+        # Same winner as the full ensemble: highest confidence, ties going
+        # to the earlier model in all_models
+        candidate = (confidence, -model_rank[model_name])
+        if best is None or candidate > best[0]:
+            classes = model.classes_
+            best = (candidate, model_name, prediction, {classes[i]: probabilities[i] for i in range(len(classes))})
+        
+        threshold = stage_thresholds.get(model_name)
+        if threshold is not None and best[0][0] >= threshold:
+            break
+    
+    if best is None:
+        raise Exception("All models failed to make prediction")
+    
+    (best_confidence, _), best_model_name, best_prediction, prob_dict = best
+    return {
+        'predicted_risk': best_prediction,
+        'confidence': best_confidence,
+        'probabilities': prob_dict,
+        'method': f'{best_model_name}_survey_ml',
+        'model_used': best_model_name,
+        'model_version': model_data.get('model_version'),
+        'cascade_stage': stages_run
+    }
+
+def encode_survey_batch(surveys, model_data):
+    """Encode many surveys at once; returns the code matrix and rows needing the live path"""
+    import numpy as np
+    
+    codes = encoder_codes(model_data)
+    feature_columns = model_data['feature_columns']
+    
+    # Rows with missing or non-string answers are left to the one-row path,
+    # which decides how they fall back
+    live_rows = np.array([
+        not all(isinstance(survey.get(column), str) for column in feature_columns)
+        for survey in surveys
+    ], dtype=bool)
+    
+    # Straight to int8 codes with dict lookups; unseen categories (and the
+    # live rows, which are not scored here) are encoded as 0 like the live path
+    encoded = np.empty((len(surveys), len(feature_columns)), dtype=CODE_DTYPE)
+    for j, column in enumerate(feature_columns):
+        column_codes = codes[column]
+        encoded[:, j] = np.fromiter(
+            (column_codes.get(survey.get(column), 0) if not live else 0
+             for survey, live in zip(surveys, live_rows)),
+            dtype=CODE_DTYPE, count=len(surveys)
+        )
+    
+    return encoded, live_rows
+
+def predict_risk_batch(surveys, model_data=None, cascade=False, thresholds=None):
+    """Predict risk levels for many surveys with one predict_proba per model"""
+    import numpy as np
+    
+    surveys = list(surveys)
+    if not surveys:
+        return []
+    
+    try:
+        if model_data is None:
+            model_data = cached_model_data()
+    except FileNotFoundError:
+        return [fallback_prediction(survey) for survey in surveys]
+    except Exception as e:
+        print(f"ML prediction error: {e}", file=sys.stderr)
+        return [fallback_prediction(survey) for survey in surveys]
+    
+    with timed('encode_batch'):
+        encoded, live_rows = encode_survey_batch(surveys, model_data)
+    all_models = model_data['all_models']
+    model_rank = {name: rank for rank, name in enumerate(all_models)}
+    if cascade:
+        order, stage_thresholds = cascade_plan(model_data, thresholds)
+    else:
+        order, stage_thresholds = list(all_models), {}
+    
+    # Score the still-active rows with each model in turn. Without a cascade
+    # every row stays active, so each model sees the whole matrix once
+    n_rows = len(surveys)
+    active = ~live_rows
+    best_confidences = np.full(n_rows, -np.inf)
+    best_ranks = np.full(n_rows, len(all_models))
+    best_models = np.full(n_rows, -1)
+    stages_run = np.zeros(n_rows, dtype=np.int64)
+    model_names = []
+    predictions = []
+    probabilities = []
+    for model_name in order:
+        rows = np.flatnonzero(active)
+        if not len(rows):
+            break
+        try:
+            with timed(f'model.{model_name}.predict'):
+                model_predictions = all_models[model_name].predict(encoded[rows])
+            with timed(f'model.{model_name}.predict_proba'):
+                model_probabilities = all_models[model_name].predict_proba(encoded[rows])
+        except Exception as e:
+            print(f"Error with model {model_name}: {e}", file=sys.stderr)
+            continue
+        
+        m = len(model_names)
+        model_names.append(model_name)
+        predictions.append(dict(zip(rows, model_predictions)))
+        probabilities.append(dict(zip(rows, model_probabilities)))
+        stages_run[rows] += 1
         
-        if best_prediction is None:
-            raise Exception("All models failed to make prediction")
+        # Highest confidence wins; ties go to the earlier model in all_models,
+        # which matches the strict comparison in predict_with_models
+        confidences = model_probabilities.max(axis=1)
+        rank = model_rank[model_name]
+        better = (confidences > best_confidences[rows]) | (
+            (confidences == best_confidences[rows]) & (rank < best_ranks[rows])
+        )
+        improved = rows[better]
+        best_confidences[improved] = confidences[better]
+        best_ranks[improved] = rank
+        best_models[improved] = m
         
-        return {
-            'predicted_risk': best_prediction,
-            'confidence': best_confidence,
-            'probabilities': prob_dict,
-            'method': f'{best_model_name}_survey_ml',
-            'model_used': best_model_name
+        threshold = stage_thresholds.get(model_name)
+        if threshold is not None:
+            active[rows[best_confidences[rows] >= threshold]] = False
+    
+    if not model_names:
+        print("ML prediction error: All models failed to make prediction", file=sys.stderr)
+        return [fallback_prediction(survey) for survey in surveys]
+    
+    classes = [list(all_models[name].classes_) for name in model_names]
+    results = []
+    for i, survey in enumerate(surveys):
+        if live_rows[i]:
+            results.append(predict_risk_from_survey(survey, model_data))
+            continue
+        m = best_models[i]
+        model_name = model_names[m]
+        result = {
+            'predicted_risk': predictions[m][i],
+            'confidence': best_confidences[i],
+            'probabilities': dict(zip(classes[m], probabilities[m][i])),
+            'method': f'{model_name}_survey_ml',
+            'model_used': model_name,
+            'model_version': model_data.get('model_version')
         }
+        if cascade:
+            result['cascade_stage'] = int(stages_run[i])
+        results.append(result)
+    return results
+
+def read_survey_file(path):
+    """Yield survey dicts from a JSONL or CSV file"""
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+def batch_command(input_path, chunk_size=BATCH_CHUNK_SIZE, output_stream=None, cascade=False):
+    """Score a survey file in chunks and stream JSONL results"""
+    output_stream = output_stream or sys.stdout
+    model_data = None
+    try:
+        model_data = load_model_data()
+    except FileNotFoundError:
+        print("Model file not found, using rule-based fallback", file=sys.stderr)
+    except Exception as e:
+        print(f"ML model load error: {e}", file=sys.stderr)
+    
+    row_number = 0
+    rows = iter(read_survey_file(input_path))
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        
+        # Rows may carry an id; otherwise the row number identifies them
+        timing.begin()
+        surveys = [row['survey'] if isinstance(row.get('survey'), dict) else row for row in chunk]
+        with timed('total'):
+            if model_data is None:
+                results = [fallback_prediction(survey) for survey in surveys]
+            else:
+                results = predict_risk_batch(surveys, model_data, cascade=cascade)
+        
+        for row, result in zip(chunk, results):
+            request_id = row.get('id', row_number)
+            output_stream.write(json.dumps({'id': request_id, 'result': result}) + '\n')
+            row_number += 1
+        output_stream.flush()
+        timing.emit(timing.end(), force=True, rows=len(chunk))
+    
+    print(f"Scored {row_number} surveys from {input_path}", file=sys.stderr)
+    if timing.enabled():
+        print(json.dumps({'rows': row_number, 'percentiles': timing.percentiles()}), file=sys.stderr)
+
+def compile_answer_table(model_data, model_path=MODEL_PATH):
+    """Evaluate the trained models on every possible survey answer combination
+    
+    model_path is the artifact the table is recorded as compiled from;
+    registry versions pass None, since their entries carry model_version.
+    """
+    feature_columns = model_data['feature_columns']
+    categories = {
+        column: [str(value) for value in model_data['encoders'][column].classes_]
+        for column in feature_columns
+    }
+    
+    # Entries are stored row-major over the encoded answers, so the position
+    # of a combination is a mixed-radix number of its category codes
+    entries = []
+    for combination in itertools.product(*(categories[column] for column in feature_columns)):
+        survey_data = dict(zip(feature_columns, combination))
+        result = predict_with_models(survey_data, model_data)
+        # Round-trip through JSON so entries hold exactly what gets served
+        entries.append(json.loads(json.dumps(result)))
+    
+    table = {
+        'format_version': TABLE_FORMAT_VERSION,
+        'source_model': os.path.basename(model_path) if model_path else None,
+        'source_sha256': file_sha256(model_path) if model_path and os.path.exists(model_path) else None,
+        'feature_columns': feature_columns,
+        'categories': categories,
+        'entries': entries
+    }
+    return table
+
+def save_answer_table(table, table_path=TABLE_PATH):
+    """Write the answer table atomically so readers never see a partial file"""
+    temp_path = f"{table_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(table, f)
+    os.replace(temp_path, table_path)
+
+def load_answer_table(table_path=TABLE_PATH):
+    """Load the precompiled answer table, or None if it is unavailable"""
+    try:
+        with timed('load_table'), open(table_path) as f:
+            table = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Answer table load error: {e}", file=sys.stderr)
+        return None
+    
+    if table.get('format_version') != TABLE_FORMAT_VERSION:
+        print(f"Unsupported answer table format: {table.get('format_version')}", file=sys.stderr)
+        return None
+    
+    # Category -> code lookups make each answer an O(1) dict hit
+    table['codes'] = {
+        column: {value: code for code, value in enumerate(values)}
+        for column, values in table['categories'].items()
+    }
+    return table
+
+def lookup_answer_table(table, survey_data):
+    """Return the precompiled prediction for a survey, or None if not covered"""
+    index = 0
+    for column in table['feature_columns']:
+        value = survey_data.get(column)
+        # Missing or non-string answers take the live path, which decides the fallback
+        if not isinstance(value, str):
+            return None
+        codes = table['codes'][column]
+        # Unseen categories are encoded as 0, exactly like the live path
+        index = index * len(codes) + codes.get(value, 0)
+    
+    entry = table['entries'][index]
+    result = dict(entry, probabilities=dict(entry['probabilities']))
+    # Tables compiled before the registry carry no version
+    result.setdefault('model_version', None)
+    return result
+
+def verify_answer_table(table, model_data, model_path=MODEL_PATH):
+    """Compare every table entry against live model output; return mismatch count"""
+    mismatches = 0
+    
+    if table['feature_columns'] != model_data['feature_columns']:
+        print("Feature columns differ between table and model", file=sys.stderr)
+        return len(table['entries'])
+    
+    if model_path is not None:
+        source_sha256 = file_sha256(model_path) if os.path.exists(model_path) else None
+        if table.get('source_sha256') != source_sha256:
+            print(f"Table was compiled from a different {os.path.basename(model_path)}", file=sys.stderr)
+    
+    feature_columns = table['feature_columns']
+    for column in feature_columns:
+        live_categories = [str(value) for value in model_data['encoders'][column].classes_]
+        if table['categories'][column] != live_categories:
+            print(f"Categories for {column} differ between table and model", file=sys.stderr)
+            return len(table['entries'])
+    
+    combinations = itertools.product(*(table['categories'][column] for column in feature_columns))
+    for combination in combinations:
+        survey_data = dict(zip(feature_columns, combination))
+        expected = json.loads(json.dumps(predict_with_models(survey_data, model_data)))
+        actual = lookup_answer_table(table, survey_data)
+        if actual != expected:
+            mismatches += 1
+            print(f"Mismatch for {survey_data}: table={actual} live={expected}", file=sys.stderr)
+    
+    return mismatches
+
+def file_sha256(path):
+    """Hash a file's bytes so artifacts can record what they were built from"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def predict_risk_from_survey(survey_data, model_data=None, answer_table=None, cascade=False):
+    """Predict risk level from survey responses"""
+    # Precompiled answers cover every known combination without loading sklearn;
+    # they encode the full ensemble, so cascade mode always runs the models
+    if answer_table is None and model_data is None and not cascade:
+        answer_table = cached_answer_table()
+    if answer_table is not None and not cascade:
+        with timed('table_lookup'):
+            result = lookup_answer_table(answer_table, survey_data)
+        if result is not None:
+            return result
+    
+    try:
+        # Use the cached model unless the caller already holds one
+        if model_data is None:
+            model_data = cached_model_data()
+        
+        if cascade:
+            return predict_with_cascade(survey_data, model_data)
+        return predict_with_models(survey_data, model_data)
         
     except FileNotFoundError:
         # Fallback if model file doesn't exist
@@ -80,37 +660,49 @@ def predict_risk_from_survey(survey_data):
         print(f"ML prediction error: {e}", file=sys.stderr)
         return fallback_prediction(survey_data)
 
+# Rule-based fallback points per answer, indexed by schema code: risk
+# tolerance 40%, experience 25%, time horizon 20%, goal 15%
+RULE_WEIGHTS = {
+    'risk': {'High': 4, 'Medium': 2},
+    'experience': {'Advanced': 2.5, 'Intermediate': 1.25},
+    'investmentDuration': {'Long-term (7+ years)': 2, 'Medium-term (3-7 years)': 1},
+    'goal': {'Wealth Growth': 1.5, 'Passive Income': 0.75}
+}
+RULE_POINTS = {
+    column: [weights.get(value, 0) for value in CATEGORIES[column]]
+    for column, weights in RULE_WEIGHTS.items()
+}
+# Free-text durations ("Long-term", "Long-term (10+ years)") still score by
+# keyword, as the rules did before they were table-driven; first match wins
+RULE_KEYWORDS = {
+    'investmentDuration': (('Long-term', 2), ('Medium-term', 1))
+}
+RULE_DEFAULTS = {
+    'risk': 'Medium',
+    'experience': 'Intermediate',
+    'investmentDuration': 'Medium-term (3-7 years)',
+    'goal': 'Wealth Growth'
+}
+
 def fallback_prediction(survey_data):
     """Rule-based fallback prediction"""
+    with timed('fallback'):
+        return rule_based_prediction(survey_data)
+
+def rule_based_prediction(survey_data):
+    """Score the survey answers with fixed weights"""
+    # Missing answers take the default; other answers outside the schema only
+    # score through RULE_KEYWORDS
+    answers = {column: survey_data.get(column, default) for column, default in RULE_DEFAULTS.items()}
+    codes = encode_answers(answers, RULE_POINTS)
     risk_score = 0
-    
-    # Risk tolerance (40% weight)
-    risk = survey_data.get('risk', 'Medium')
-    if risk == 'High':
-        risk_score += 4
-    elif risk == 'Medium':
-        risk_score += 2
-    
-    # Experience (25% weight)
-    experience = survey_data.get('experience', 'Intermediate')
-    if experience == 'Advanced':
-        risk_score += 2.5
-    elif experience == 'Intermediate':
-        risk_score += 1.25
-    
-    # Time horizon (20% weight)
-    duration = survey_data.get('investmentDuration', 'Medium-term (3-7 years)')
-    if 'Long-term' in duration:
-        risk_score += 2
-    elif 'Medium-term' in duration:
-        risk_score += 1
-    
-    # Goal (15% weight)
-    goal = survey_data.get('goal', 'Wealth Growth')
-    if goal == 'Wealth Growth':
-        risk_score += 1.5
-    elif goal == 'Passive Income':
-        risk_score += 0.75
+    for column, code in zip(RULE_POINTS, codes):
+        if code >= 0:
+            risk_score += RULE_POINTS[column][code]
+        elif isinstance(answers[column], str):
+            risk_score += next(
+                (points for keyword, points in RULE_KEYWORDS.get(column, ()) if keyword in answers[column]), 0
+            )
     
     # Determine risk level
     if risk_score >= 6.0:
@@ -132,21 +724,210 @@ def fallback_prediction(survey_data):
             'High': confidence if predicted_risk == 'High' else (1 - confidence) / 2
         },
         'method': 'rule_based_fallback',
-        'model_used': 'fallback'
+        'model_used': 'fallback',
+        'model_version': None
+    }
+
+def serve(input_stream=None, output_stream=None, cascade=False):
+    """Answer newline-delimited survey requests from one long-lived process"""
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    
+    # The answer table serves known combinations; the model is only loaded
+    # if some request falls outside it. Both come from the shared caches, so
+    # a retrain is picked up without restarting the server. A failed model
+    # load is retried at most every ARTIFACT_CHECK_INTERVAL seconds, so a
+    # server started before the first training starts using the model once
+    # it exists
+    model_retry_at = 0.0
+    
+    while True:
+        line = input_stream.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            request_id = request.get('id')
+            if request.get('stats'):
+                output_stream.write(json.dumps({'id': request_id, 'stats': timing.percentiles()}) + '\n')
+                output_stream.flush()
+                continue
+            survey_data = request.get('survey')
+            if not isinstance(survey_data, dict):
+                raise ValueError("Request is missing the 'survey' object")
+            
+            timing.begin()
+            with timed('total'):
+                result = None
+                answer_table = None if cascade else cached_answer_table()
+                if answer_table:
+                    with timed('table_lookup'):
+                        result = lookup_answer_table(answer_table, survey_data)
+                if result is None:
+                    model_data = None
+                    now = time.monotonic()
+                    if now >= model_retry_at:
+                        try:
+                            model_data = cached_model_data()
+                        except FileNotFoundError:
+                            model_retry_at = now + ARTIFACT_CHECK_INTERVAL
+                            print("Model file not found, serving rule-based fallback", file=sys.stderr)
+                        except Exception as e:
+                            model_retry_at = now + ARTIFACT_CHECK_INTERVAL
+                            print(f"ML model load error: {e}", file=sys.stderr)
+                    
+                    if model_data is None:
+                        result = fallback_prediction(survey_data)
+                    else:
+                        result = predict_risk_from_survey(survey_data, model_data, cascade=cascade)
+            response = {'id': request_id, 'result': result}
+            timings = timing.end()
+            if timing.mode() == 'field':
+                response['timings'] = timings
+            timing.emit(timings, id=request_id)
+        except json.JSONDecodeError as e:
+            response = {'id': request_id, 'error': f"Invalid JSON input: {e}"}
+        except Exception as e:
+            response = {'id': request_id, 'error': f"Prediction error: {e}"}
+        
+        output_stream.write(json.dumps(response) + '\n')
+        output_stream.flush()
+
+def measure_startup(survey_data=None):
+    """Measure cold import cost of a one-shot table prediction with -X importtime"""
+    import subprocess
+    
+    survey_data = survey_data or {
+        'risk': 'High',
+        'goal': 'Wealth Growth',
+        'investmentDuration': 'Long-term (7+ years)',
+        'experience': 'Advanced'
+    }
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    code = (
+        "import predict_survey_risk as p; "
+        f"p.predict_risk_from_survey({survey_data!r})"
+    )
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=module_dir, capture_output=True, text=True, check=True
+    )
+    
+    # Lines look like "import time:  self [us] |  cumulative | package"
+    total_us = 0
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue
+        total_us += int(self_us)
+        modules.append(name.strip())
+    
+    heavy_modules = sorted({
+        name.split('.')[0] for name in modules if name.split('.')[0] in HEAVY_MODULES
+    })
+    return {
+        'import_ms': total_us / 1000,
+        'budget_ms': STARTUP_BUDGET_MS,
+        'modules_imported': len(modules),
+        'heavy_modules': heavy_modules
     }
 
+def check_startup_command():
+    """Fail if a cold table prediction exceeds its import budget or loads heavy modules"""
+    report = measure_startup()
+    print(json.dumps(report))
+    
+    if report['heavy_modules']:
+        print(f"Cold prediction imported heavy modules: {report['heavy_modules']}", file=sys.stderr)
+        sys.exit(1)
+    if report['import_ms'] > STARTUP_BUDGET_MS:
+        print(f"Cold prediction imports took {report['import_ms']:.1f} ms (budget {STARTUP_BUDGET_MS} ms)", file=sys.stderr)
+        sys.exit(1)
+
+def compile_table_command():
+    """Compile the answer table of the served model: the current registry version, else the pickle"""
+    version = registry.current_version()
+    if version is None:
+        table = compile_answer_table(load_model_data(MODEL_PATH))
+        save_answer_table(table)
+        table_path = TABLE_PATH
+    else:
+        # From the pickled estimators, as training compiles it
+        table = compile_answer_table(registry.load_version(version, prefer_arrays=False), model_path=None)
+        table_path = registry.save_table(table, version)
+    print(f"Answer table with {len(table['entries'])} entries saved to {table_path}", file=sys.stderr)
+
+def verify_table_command():
+    """Check that the served answer table matches live model output exactly"""
+    version = registry.current_version()
+    if version is None:
+        table_path, model_data, model_path = TABLE_PATH, load_model_data(MODEL_PATH), MODEL_PATH
+    else:
+        table_path = os.path.join(registry.version_dir(version), 'table.json')
+        model_data, model_path = registry.load_version(version, prefer_arrays=False), None
+    table = load_answer_table(table_path)
+    if table is None:
+        print(f"No answer table found at {table_path}", file=sys.stderr)
+        sys.exit(1)
+    
+    mismatches = verify_answer_table(table, model_data, model_path)
+    if mismatches:
+        print(f"Answer table mismatches live models on {mismatches} of {len(table['entries'])} entries", file=sys.stderr)
+        sys.exit(1)
+    print(f"Answer table matches live models on all {len(table['entries'])} entries", file=sys.stderr)
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python predict_survey_risk.py '<survey_json>'", file=sys.stderr)
+    args = sys.argv[1:]
+    cascade = '--cascade' in args
+    if cascade:
+        args.remove('--cascade')
+    
+    commands = {
+        '--compile-table': compile_table_command,
+        '--verify-table': verify_table_command,
+        '--check-startup': check_startup_command
+    }
+    if args == ['--serve']:
+        serve(cascade=cascade)
+        return
+    
+    if len(args) == 1 and args[0] in commands:
+        commands[args[0]]()
+        return
+    
+    if len(args) == 2 and args[0] == '--batch':
+        batch_command(args[1], cascade=cascade)
+        return
+    
+    if len(args) != 1:
+        print("Usage: python predict_survey_risk.py [--cascade] '<survey_json>' | --serve | --batch <in.jsonl|in.csv>", file=sys.stderr)
+        print("       python predict_survey_risk.py --compile-table | --verify-table | --check-startup", file=sys.stderr)
         sys.exit(1)
     
     try:
         # Parse input JSON
-        survey_json = sys.argv[1]
+        survey_json = args[0]
         survey_data = json.loads(survey_json)
         
         # Make prediction
-        result = predict_risk_from_survey(survey_data)
+        timing.begin()
+        timing.record('import', IMPORT_MS)
+        with timed('total'):
+            result = predict_risk_from_survey(survey_data, cascade=cascade)
+        timings = timing.end()
+        if timing.mode() == 'field':
+            result['timings'] = timings
+        timing.emit(timings)
         
         # Output result as JSON
         print(json.dumps(result))
@@ -158,5 +939,9 @@ def main():
         print(f"Prediction error: {e}", file=sys.stderr)
         sys.exit(1)
 
+# Time spent importing this module, reported as the 'import' stage of
+# one-shot predictions
+IMPORT_MS = (time.perf_counter_ns() - _IMPORT_STARTED) / 1e6
+
 if __name__ == "__main__":
     main()
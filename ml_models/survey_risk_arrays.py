@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Compact array artifact for the survey risk models
+Usage: python survey_risk_arrays.py --export   (from survey_risk_model.pkl)
+       python survey_risk_arrays.py --verify
+
+Every trained model is flattened into plain arrays (forest node arrays,
+linear model coefficients, SVC support vectors and dual coefficients,
+categorical naive Bayes log probabilities)
+stored back to back in one binary file, with a small JSON manifest holding
+encoders, classes and metadata. Loading memory-maps the binary file, so it is
+near-instant and processes loading the same artifact share its pages. The
+array models below reproduce predict / predict_proba with NumPy only.
+"""
+
+import sys
+import os
+import json
+import glob
+import hashlib
+import numpy as np
+
+from predict_survey_risk import ARRAYS_MANIFEST_PATH
+ARRAYS_FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+def unique_rows(X):
+    """Collapse repeated feature rows; survey answers repeat heavily in batches"""
+    unique, inverse = np.unique(X, axis=0, return_inverse=True)
+    return unique, inverse.reshape(-1)
+
+class EncoderArrays:
+    """Stand-in for a fitted LabelEncoder: only the sorted classes"""
+
+    def __init__(self, classes):
+        self.classes_ = np.array(classes)
+
+class ForestArrays:
+    """RandomForestClassifier as flat node arrays of all its trees"""
+
+    def __init__(self, classes, arrays, params):
+        self.classes_ = np.array(classes)
+        self.roots = arrays['roots']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.max_depth = params['max_depth']
+
+    @staticmethod
+    def export(model):
+        """Flatten a fitted forest; leaves point at themselves in left/right"""
+        roots, left, right, feature, threshold, value = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            # Leaf outputs normalized exactly like DecisionTreeClassifier.predict_proba
+            tree_value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = tree_value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(tree_value / normalizer)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {
+            'roots': np.array(roots, dtype=np.int32),
+            'left': np.concatenate(left).astype(np.int32),
+            'right': np.concatenate(right).astype(np.int32),
+            'feature': np.concatenate(feature).astype(np.int32),
+            'threshold': np.concatenate(threshold).astype(np.float64),
+            'value': np.concatenate(value)
+        }
+        return arrays, {'max_depth': int(max_depth)}
+
+    def predict_proba(self, X):
+        # Trees compare float32 features against float64 thresholds
+        X, inverse = unique_rows(np.asarray(X, dtype=np.float32))
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # Accumulate tree by tree, in estimator order, like sklearn does
+        proba = np.zeros((X.shape[0], self.value.shape[1]))
+        for t in range(len(self.roots)):
+            proba += self.value[nodes[:, t]]
+        proba /= len(self.roots)
+        return proba[inverse]
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+class LinearArrays:
+    """LogisticRegression or log-loss SGDClassifier as coefficient and intercept arrays"""
+
+    def __init__(self, classes, arrays, params):
+        self.classes_ = np.array(classes)
+        self.coef = arrays['coef']
+        self.intercept = arrays['intercept']
+        self.ovr = params['ovr']
+
+    @staticmethod
+    def export(model):
+        if not hasattr(model, 'solver'):
+            # SGDClassifier probabilities are normalized one-vs-rest sigmoids
+            if getattr(model, 'loss', None) != 'log_loss':
+                raise ValueError(f"SGDClassifier needs loss='log_loss' for probabilities, not {model.loss!r}")
+            ovr = True
+        else:
+            # Mirror LogisticRegression.predict_proba's choice between OvR and softmax
+            multi_class = getattr(model, 'multi_class', 'deprecated')
+            ovr = multi_class in ('ovr', 'warn') or (
+                multi_class in ('auto', 'deprecated')
+                and (len(model.classes_) <= 2 or model.solver == 'liblinear')
+            )
+        arrays = {
+            'coef': np.asarray(model.coef_, dtype=np.float64),
+            'intercept': np.asarray(model.intercept_, dtype=np.float64)
+        }
+        return arrays, {'ovr': bool(ovr)}
+
+    def decision_function(self, X):
+        scores = np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X):
+        decision = self.decision_function(X)
+        if self.ovr:
+            proba = 1.0 / (1.0 + np.exp(-decision))
+            if proba.ndim == 1:
+                return np.vstack([1 - proba, proba]).T
+            return proba / proba.sum(axis=1).reshape((proba.shape[0], -1))
+
+        if decision.ndim == 1:
+            decision = np.c_[-decision, decision]
+        decision = decision - decision.max(axis=1).reshape((-1, 1))
+        proba = np.exp(decision)
+        return proba / proba.sum(axis=1).reshape((-1, 1))
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[np.argmax(scores, axis=1)]
+
+class CategoricalNBArrays:
+    """CategoricalNB as class log priors plus one log probability table per feature"""
+
+    def __init__(self, classes, arrays, params):
+        self.classes_ = np.array(classes)
+        self.log_prior = arrays['log_prior']
+        self.log_prob = [arrays[f'log_prob_{i}'] for i in range(params['n_features'])]
+
+    @staticmethod
+    def export(model):
+        arrays = {'log_prior': np.asarray(model.class_log_prior_, dtype=np.float64)}
+        for i, log_prob in enumerate(model.feature_log_prob_):
+            arrays[f'log_prob_{i}'] = np.asarray(log_prob, dtype=np.float64)
+        return arrays, {'n_features': len(model.feature_log_prob_)}
+
+    def joint_log_likelihood(self, X):
+        # Same summation order as CategoricalNB._joint_log_likelihood
+        X = np.asarray(X, dtype=np.int64)
+        jll = np.zeros((X.shape[0], len(self.classes_)))
+        for i, log_prob in enumerate(self.log_prob):
+            jll += log_prob[:, X[:, i]].T
+        return jll + self.log_prior
+
+    def predict_proba(self, X):
+        jll = self.joint_log_likelihood(X)
+        jll_max = jll.max(axis=1, keepdims=True)
+        log_prob_x = np.log(np.exp(jll - jll_max).sum(axis=1, keepdims=True)) + jll_max
+        return np.exp(jll - log_prob_x)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.joint_log_likelihood(X), axis=1)]
+
+class KernelSVCArrays:
+    """RBF SVC with Platt scaling as support vector and dual coefficient arrays"""
+
+    def __init__(self, classes, arrays, params):
+        self.classes_ = np.array(classes)
+        self.support_vectors = arrays['support_vectors']
+        self.dual_coef = arrays['dual_coef']
+        self.intercept = arrays['intercept']
+        self.prob_a = arrays['prob_a']
+        self.prob_b = arrays['prob_b']
+        self.n_support = [int(n) for n in params['n_support']]
+        self.gamma = params['gamma']
+
+    @staticmethod
+    def export(model):
+        if model.kernel != 'rbf':
+            raise ValueError(f"Unsupported SVC kernel: {model.kernel}")
+        if not model.probability:
+            raise ValueError("SVC must be trained with probability=True")
+        # The private libsvm-layout attributes are what SVC itself predicts with
+        arrays = {
+            'support_vectors': np.asarray(model.support_vectors_, dtype=np.float64),
+            'dual_coef': np.asarray(model._dual_coef_, dtype=np.float64),
+            'intercept': np.asarray(model._intercept_, dtype=np.float64),
+            'prob_a': np.asarray(model.probA_, dtype=np.float64),
+            'prob_b': np.asarray(model.probB_, dtype=np.float64)
+        }
+        params = {
+            'n_support': [int(n) for n in model._n_support],
+            'gamma': float(model._gamma)
+        }
+        return arrays, params
+
+    def decision_values(self, X):
+        """One-vs-one decision values in libsvm pair order"""
+        X = np.asarray(X, dtype=np.float64)
+        distances = (
+            (X ** 2).sum(axis=1)[:, None]
+            - 2 * X @ self.support_vectors.T
+            + (self.support_vectors ** 2).sum(axis=1)[None, :]
+        )
+        kernel = np.exp(-self.gamma * np.maximum(distances, 0))
+
+        starts = np.concatenate([[0], np.cumsum(self.n_support)])
+        values = []
+        pair = 0
+        for i in range(len(self.n_support)):
+            for j in range(i + 1, len(self.n_support)):
+                si, ei = starts[i], starts[i + 1]
+                sj, ej = starts[j], starts[j + 1]
+                value = (
+                    kernel[:, si:ei] @ self.dual_coef[j - 1, si:ei]
+                    + kernel[:, sj:ej] @ self.dual_coef[i, sj:ej]
+                    + self.intercept[pair]
+                )
+                values.append(value)
+                pair += 1
+        return np.stack(values, axis=1)
+
+    def predict(self, X):
+        # libsvm votes over every pair; ties go to the lower class index
+        X, inverse = unique_rows(np.asarray(X, dtype=np.float64))
+        decision = self.decision_values(X)
+        n_classes = len(self.n_support)
+        votes = np.zeros((decision.shape[0], n_classes), dtype=np.int64)
+        pair = 0
+        for i in range(n_classes):
+            for j in range(i + 1, n_classes):
+                wins = decision[:, pair] > 0
+                votes[:, i] += wins
+                votes[:, j] += ~wins
+                pair += 1
+        return self.classes_[np.argmax(votes, axis=1)][inverse]
+
+    def predict_proba(self, X):
+        X, inverse = unique_rows(np.asarray(X, dtype=np.float64))
+        decision = self.decision_values(X)
+        n_classes = len(self.n_support)
+        min_prob = 1e-7
+
+        # Platt-scaled pairwise probabilities r[i, j] = P(class i | i or j)
+        f = decision * self.prob_a + self.prob_b
+        pairwise = np.where(
+            f >= 0,
+            np.exp(-np.abs(f)) / (1.0 + np.exp(-np.abs(f))),
+            1.0 / (1.0 + np.exp(-np.abs(f)))
+        )
+        pairwise = np.clip(pairwise, min_prob, 1 - min_prob)
+        r = np.zeros((decision.shape[0], n_classes, n_classes))
+        pair = 0
+        for i in range(n_classes):
+            for j in range(i + 1, n_classes):
+                r[:, i, j] = pairwise[:, pair]
+                r[:, j, i] = 1 - pairwise[:, pair]
+                pair += 1
+
+        return multiclass_probability(r)[inverse]
+
+def multiclass_probability(r):
+    """Pairwise coupling of libsvm (Wu, Lin and Weng, method 2), row by row in lockstep"""
+    n_rows, k = r.shape[0], r.shape[1]
+    # Q[t, t] = sum_j r[j, t]^2 and Q[t, j] = -r[j, t] * r[t, j]
+    Q = -r.transpose(0, 2, 1) * r
+    diagonal = np.arange(k)
+    Q[:, diagonal, diagonal] = (r ** 2).sum(axis=1)
+
+    p = np.full((n_rows, k), 1.0 / k)
+    eps = 0.005 / k
+    active = np.arange(n_rows)
+    for _ in range(max(100, k)):
+        # Recalculate Qp and pQp each round for numerical accuracy; rows
+        # leave the iteration as soon as they meet libsvm's stopping rule
+        Qa, pa = Q[active], p[active]
+        Qp = np.einsum('ntj,nj->nt', Qa, pa)
+        pQp = np.einsum('nt,nt->n', pa, Qp)
+        running = np.abs(Qp - pQp[:, None]).max(axis=1) >= eps
+        active, Qa, pa, Qp, pQp = active[running], Qa[running], pa[running], Qp[running], pQp[running]
+        if not len(active):
+            break
+        for t in range(k):
+            diff = (-Qp[:, t] + pQp) / Qa[:, t, t]
+            pa[:, t] += diff
+            pQp = (pQp + diff * (diff * Qa[:, t, t] + 2 * Qp[:, t])) / (1 + diff) / (1 + diff)
+            Qp = (Qp + diff[:, None] * Qa[:, t, :]) / (1 + diff)[:, None]
+            pa /= (1 + diff)[:, None]
+        p[active] = pa
+    return p
+
+MODEL_KINDS = {
+    'RandomForestClassifier': ('forest', ForestArrays),
+    'LogisticRegression': ('linear', LinearArrays),
+    'SGDClassifier': ('linear', LinearArrays),
+    'SVC': ('svc', KernelSVCArrays),
+    'CategoricalNB': ('categorical_nb', CategoricalNBArrays)
+}
+ARRAY_MODELS = {kind: cls for kind, cls in MODEL_KINDS.values()}
+
+def pack_arrays(arrays):
+    """Lay named arrays out back to back, each aligned for direct memory-mapped views"""
+    chunks = []
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        padding = -position % ALIGNMENT
+        chunks.append(b'\0' * padding)
+        position += padding
+        layout[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': position
+        }
+        chunks.append(array.tobytes())
+        position += array.nbytes
+    return b''.join(chunks), layout
+
+def view_arrays(data, layout):
+    """Zero-copy views of packed arrays over a buffer or memory map"""
+    arrays = {}
+    for name, spec in layout.items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+    return arrays
+
+def map_data_file(data_path):
+    return np.memmap(data_path, dtype=np.uint8, mode='r') if os.path.getsize(data_path) else b''
+
+def export_estimator_arrays(model):
+    """One fitted model as (manifest spec, packed array bytes)"""
+    kind, cls = MODEL_KINDS[type(model).__name__]
+    model_arrays, params = cls.export(model)
+    data, layout = pack_arrays(model_arrays)
+    return {
+        'kind': kind,
+        'classes': [str(c) for c in model.classes_],
+        'params': params,
+        'arrays': layout
+    }, data
+
+def load_estimator_arrays(spec, data):
+    """Array model for one manifest spec over its packed data"""
+    return ARRAY_MODELS[spec['kind']](spec['classes'], view_arrays(data, spec['arrays']), spec['params'])
+
+def export_model_arrays(model_data, manifest_path=ARRAYS_MANIFEST_PATH, source_path=None):
+    """Write every model in model_data as flat arrays plus a JSON manifest"""
+    arrays = {}
+    models = {}
+    for name, model in model_data['all_models'].items():
+        kind, cls = MODEL_KINDS[type(model).__name__]
+        model_arrays, params = cls.export(model)
+        models[name] = {
+            'kind': kind,
+            'classes': [str(c) for c in model.classes_],
+            'params': params,
+            'arrays': {}
+        }
+        for array_name, array in model_arrays.items():
+            arrays[(name, array_name)] = array
+
+    data, layout = pack_arrays(arrays)
+    for (name, array_name), spec in layout.items():
+        models[name]['arrays'][array_name] = spec
+
+    # The data file is named after its content, so a manifest never points
+    # at a half-written or newer file
+    digest = hashlib.sha256(data).hexdigest()
+    base = os.path.splitext(manifest_path)[0]
+    data_path = f"{base}.{digest[:12]}.bin"
+    if not os.path.exists(data_path):
+        with open(f"{data_path}.tmp", 'wb') as f:
+            f.write(data)
+        os.replace(f"{data_path}.tmp", data_path)
+
+    manifest = {
+        'format_version': ARRAYS_FORMAT_VERSION,
+        'data_file': os.path.basename(data_path),
+        'data_sha256': digest,
+        'source_model': os.path.basename(source_path) if source_path else None,
+        'best_model_name': model_data['best_model_name'],
+        'feature_columns': list(model_data['feature_columns']),
+        'encoders': {
+            column: [str(c) for c in encoder.classes_]
+            for column, encoder in model_data['encoders'].items()
+        },
+        'results': {name: float(acc) for name, acc in model_data['results'].items()},
+        'cascade': model_data.get('cascade'),
+        'models': models
+    }
+    with open(f"{manifest_path}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    # Older data files are no longer referenced; processes still mapping them keep their pages
+    for stale_path in glob.glob(f"{glob.escape(base)}.*.bin"):
+        if stale_path != data_path:
+            os.remove(stale_path)
+
+    return manifest
+
+def load_model_arrays(manifest_path=ARRAYS_MANIFEST_PATH):
+    """Load the array artifact as a model_data dict usable by the predictors"""
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != ARRAYS_FORMAT_VERSION:
+        raise ValueError(f"Unsupported array artifact format: {manifest.get('format_version')}")
+
+    data = map_data_file(os.path.join(os.path.dirname(manifest_path), manifest['data_file']))
+    all_models = {name: load_estimator_arrays(spec, data) for name, spec in manifest['models'].items()}
+
+    best_model_name = manifest['best_model_name']
+    return {
+        'best_model': all_models.get(best_model_name),
+        'best_model_name': best_model_name,
+        'best_accuracy': manifest['results'].get(best_model_name),
+        'all_models': all_models,
+        'encoders': {column: EncoderArrays(classes) for column, classes in manifest['encoders'].items()},
+        'feature_columns': manifest['feature_columns'],
+        'results': manifest['results'],
+        'cascade': manifest.get('cascade')
+    }
+
+def verify_model_arrays(model_data, array_data, n_random=2000, seed=0):
+    """Compare array models with the sklearn models; return per-model differences"""
+    import itertools
+
+    feature_columns = model_data['feature_columns']
+    sizes = [len(model_data['encoders'][column].classes_) for column in feature_columns]
+    grid = np.array(list(itertools.product(*(range(size) for size in sizes))), dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    random_rows = np.stack([rng.integers(0, size, n_random) for size in sizes], axis=1)
+    X = np.vstack([grid, random_rows])
+
+    report = {}
+    for name, model in model_data['all_models'].items():
+        array_model = array_data['all_models'][name]
+        report[name] = {
+            'max_proba_diff': float(np.abs(model.predict_proba(X) - array_model.predict_proba(X)).max()),
+            'predict_mismatches': int((model.predict(X) != array_model.predict(X)).sum()),
+            'rows': len(X)
+        }
+    return report
+
+def main():
+    import pickle
+    import warnings
+    warnings.filterwarnings('ignore')
+    from predict_survey_risk import MODEL_PATH
+
+    if len(sys.argv) != 2 or sys.argv[1] not in ('--export', '--verify'):
+        print("Usage: python survey_risk_arrays.py --export | --verify", file=sys.stderr)
+        sys.exit(1)
+
+    with open(MODEL_PATH, 'rb') as f:
+        model_data = pickle.load(f)
+
+    if sys.argv[1] == '--export':
+        manifest = export_model_arrays(model_data, source_path=MODEL_PATH)
+        print(f"✅ Array artifact saved to {ARRAYS_MANIFEST_PATH} + {manifest['data_file']}")
+        return
+
+    report = verify_model_arrays(model_data, load_model_arrays())
+    print(json.dumps(report, indent=2))
+    # Probabilities may differ in the last bits from summation order only
+    if any(r['predict_mismatches'] or r['max_proba_diff'] > 1e-9 for r in report.values()):
+        print("Array models disagree with the sklearn models", file=sys.stderr)
+        sys.exit(1)
+    print("✅ Array models match the sklearn models")
+
+if __name__ == "__main__":
+    main()
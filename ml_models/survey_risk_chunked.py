@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Out-of-core training over survey CSVs too large for memory
+Usage: python survey_risk_chunked.py survey_risk_dataset.csv [--chunk-size N] [--epochs N]
+
+The CSV is streamed in chunks read with fixed categorical dtypes, so every
+answer arrives already encoded as its int8 code from survey_risk_schema.py,
+with no fit_transform pass over the data.
+Estimators that support partial_fit (CategoricalNB and a log-loss
+SGDClassifier) are updated chunk by chunk. About HOLDOUT_SHARE of the rows,
+picked by a hash of the row number, never train and are scored in a second
+pass. Memory holds one chunk plus a bounded sample of held-out rows for the
+cascade, so it stays flat as the file grows; peak RSS is reported per chunk.
+
+The result is saved like train_models output (pickle, array artifact, answer
+table and a new registry version), so the predictors serve it unchanged.
+"""
+
+import sys
+import time
+import argparse
+import resource
+import warnings
+import numpy as np
+import pandas as pd
+from sklearn.naive_bayes import CategoricalNB
+from sklearn.linear_model import SGDClassifier
+
+from survey_risk_schema import FEATURE_COLUMNS, CATEGORIES, CODE_DTYPE, schema_dtypes, schema_encoders
+from survey_risk_model import (
+    DATASET_PATH, DATASET_SEED, DATASET_CHUNK_SIZE, CASCADE_TARGET_AGREEMENT,
+    learn_cascade, print_cascade, publish_artifacts
+)
+warnings.filterwarnings('ignore')
+
+HOLDOUT_SHARE = 0.2
+CASCADE_SAMPLE_ROWS = 20000
+
+def build_incremental_models():
+    """Candidate models that can learn one chunk at a time, in selection order"""
+    return {
+        'CategoricalNB': CategoricalNB(min_categories=[len(CATEGORIES[column]) for column in FEATURE_COLUMNS]),
+        'SGDClassifier': SGDClassifier(loss='log_loss', random_state=42)
+    }
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+
+def holdout_mask(start, rows):
+    """Pick about HOLDOUT_SHARE of rows by a multiplicative hash of the row number"""
+    # Independent of the chunk size, so every chunking holds out the same rows
+    index = np.arange(start, start + rows, dtype=np.uint64)
+    hashed = (index * np.uint64(2654435761)) % np.uint64(1 << 32)
+    return hashed < np.uint64(HOLDOUT_SHARE * (1 << 32))
+
+def iter_encoded_chunks(path, chunk_size=DATASET_CHUNK_SIZE):
+    """Yield (start_row, feature codes, label codes, valid mask, holdout mask) per chunk"""
+    start = 0
+    reader = pd.read_csv(path, usecols=FEATURE_COLUMNS + ['risk_level'], dtype=schema_dtypes(), chunksize=chunk_size)
+    for chunk in reader:
+        codes = np.column_stack([chunk[column].cat.codes.to_numpy() for column in FEATURE_COLUMNS])
+        labels = chunk['risk_level'].cat.codes.to_numpy()
+        # Answers outside the schema come back as code -1
+        valid = (codes >= 0).all(axis=1) & (labels >= 0)
+        yield start, codes, labels, valid, holdout_mask(start, len(chunk))
+        start += len(chunk)
+
+def train_chunked(path, chunk_size=DATASET_CHUNK_SIZE, epochs=1, cascade_agreement=CASCADE_TARGET_AGREEMENT):
+    """Train the incremental candidates over a CSV chunk by chunk and save the artifacts"""
+    print(f"Training incremental models on {path} in chunks of {chunk_size} rows...")
+    started = time.perf_counter()
+    models = build_incremental_models()
+    classes = np.array(CATEGORIES['risk_level'], dtype=object)
+    fit_seconds = dict.fromkeys(models, 0.0)
+    train_rows = 0
+    dropped_rows = 0
+
+    for epoch in range(1, epochs + 1):
+        for chunk_index, (start, codes, labels, valid, holdout) in enumerate(iter_encoded_chunks(path, chunk_size)):
+            train = valid & ~holdout
+            if epoch == 1:
+                train_rows += int(train.sum())
+                dropped_rows += int((~valid).sum())
+            if not train.any():
+                continue
+            X = codes[train].astype(np.int64)
+            y = classes[labels[train]]
+            for name, model in models.items():
+                fit_started = time.perf_counter()
+                model.partial_fit(X, y, classes=classes)
+                fit_seconds[name] += time.perf_counter() - fit_started
+            print(f"  epoch {epoch} chunk {chunk_index + 1}: {start + len(codes)} rows, "
+                  f"peak RSS {peak_rss_mb():.0f} MB")
+
+    # Second pass: score the held-out rows and reservoir-sample some for the cascade
+    rng = np.random.default_rng(DATASET_SEED)
+    correct = dict.fromkeys(models, 0)
+    evaluate_seconds = dict.fromkeys(models, 0.0)
+    holdout_rows = 0
+    cascade_sample = np.zeros((CASCADE_SAMPLE_ROWS, len(FEATURE_COLUMNS)), dtype=np.int64)
+    for start, codes, labels, valid, holdout in iter_encoded_chunks(path, chunk_size):
+        test = valid & holdout
+        X = codes[test].astype(np.int64)
+        y = classes[labels[test]]
+        for name, model in models.items():
+            evaluate_started = time.perf_counter()
+            if len(X):
+                correct[name] += int((model.predict(X) == y).sum())
+            evaluate_seconds[name] += time.perf_counter() - evaluate_started
+
+        seen = holdout_rows + np.arange(len(X))
+        slots = np.where(seen < CASCADE_SAMPLE_ROWS, seen, rng.integers(0, seen + 1))
+        kept = slots < CASCADE_SAMPLE_ROWS
+        cascade_sample[slots[kept]] = X[kept]
+        holdout_rows += len(X)
+
+    if not train_rows or not holdout_rows:
+        raise ValueError(f"{path} has too few valid rows to train and evaluate on")
+    cascade_sample = cascade_sample[:min(holdout_rows, CASCADE_SAMPLE_ROWS)]
+
+    results = {name: correct[name] / holdout_rows for name in models}
+    timings = {
+        name: {'status': 'ok', 'fit_seconds': fit_seconds[name], 'evaluate_seconds': evaluate_seconds[name]}
+        for name in models
+    }
+    print("\nModel Training Results:")
+    print("=" * 50)
+    for name in models:
+        print(f"{name}: {results[name]:.3f} accuracy (fit {fit_seconds[name]:.2f}s, evaluate {evaluate_seconds[name]:.2f}s)")
+
+    best_model_name = max(results, key=results.get)
+    print(f"\n✅ Best Model: {best_model_name} with {results[best_model_name]:.3f} accuracy")
+
+    cascade = learn_cascade(models, cascade_sample, cascade_agreement)
+    print_cascade(cascade)
+
+    model_data = {
+        'best_model': models[best_model_name],
+        'best_model_name': best_model_name,
+        'best_accuracy': results[best_model_name],
+        'all_models': models,
+        'encoders': schema_encoders(),
+        'feature_columns': FEATURE_COLUMNS,
+        'results': results,
+        'timings': timings,
+        'cascade': cascade,
+        'training': {
+            'mode': 'chunked',
+            'source': path,
+            'chunk_size': chunk_size,
+            'epochs': epochs,
+            'train_rows': train_rows,
+            'holdout_rows': holdout_rows,
+            'dropped_rows': dropped_rows,
+            'seconds': time.perf_counter() - started,
+            'peak_rss_mb': peak_rss_mb()
+        },
+        # A sample of the held-out rows, enough to relearn the cascade
+        'holdout_X': cascade_sample.astype(CODE_DTYPE)
+    }
+
+    publish_artifacts(model_data)
+
+    training = model_data['training']
+    print(f"\n📊 {training['train_rows']} training rows, {training['holdout_rows']} held out, "
+          f"{training['dropped_rows']} dropped; {training['seconds']:.1f}s, peak RSS {training['peak_rss_mb']:.0f} MB")
+    return model_data
+
+def main():
+    parser = argparse.ArgumentParser(description="Train survey risk models out of core from a CSV")
+    parser.add_argument('path', nargs='?', default=DATASET_PATH, help="CSV in the survey_risk_dataset.csv schema")
+    parser.add_argument('--chunk-size', type=int, default=DATASET_CHUNK_SIZE, help="rows read per chunk")
+    parser.add_argument('--epochs', type=int, default=1, help="passes over the training rows")
+    parser.add_argument('--cascade-agreement', type=float, default=CASCADE_TARGET_AGREEMENT,
+                        help="held-out agreement with the full ensemble each cascade exit must reach")
+    args = parser.parse_args()
+    train_chunked(args.path, args.chunk_size, args.epochs, args.cascade_agreement)
+
+if __name__ == "__main__":
+    main()
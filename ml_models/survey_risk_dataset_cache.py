@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of generated, encoded training datasets
+Usage: python survey_risk_dataset_cache.py --list | --clear
+
+Each entry lives in <cache dir>/<sha256 of the generator inputs>/ and holds
+X.npy (int8 feature codes), y.npy (int8 label codes), meta.json (category
+lists and the inputs that were hashed) and dataset.csv (the dataset as
+train_models saves it). A hit memory-maps the arrays back, so training skips
+generation, encoding and CSV parsing. Entries are built in a temp directory
+and renamed into place, and the least recently used entries are evicted once
+the cache grows past DATASET_CACHE_MAX_BYTES.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import numpy as np
+
+from survey_risk_registry import MODEL_DIR
+
+DATASET_CACHE_DIR = os.environ.get('SURVEY_RISK_DATASET_CACHE', os.path.join(MODEL_DIR, '.dataset_cache'))
+DATASET_CACHE_MAX_BYTES = 1 << 30
+
+def cache_key(params):
+    """Hash generator inputs (any JSON-serializable dict) into an entry name"""
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def load_dataset(key, cache_dir=DATASET_CACHE_DIR):
+    """Memory-map a cached dataset, or return None on a miss"""
+    path = os.path.join(cache_dir, key)
+    meta_path = os.path.join(path, 'meta.json')
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        X = np.load(os.path.join(path, 'X.npy'), mmap_mode='r')
+        y = np.load(os.path.join(path, 'y.npy'), mmap_mode='r')
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable dataset cache entry {key[:12]}: {e}", file=sys.stderr)
+        return None
+
+    # The meta file's mtime records the last use for eviction
+    os.utime(meta_path)
+    return {
+        'key': key,
+        'X': X,
+        'y': y,
+        'meta': meta,
+        'csv_path': os.path.join(path, 'dataset.csv')
+    }
+
+def store_dataset(key, X, y, meta, csv_path=None, cache_dir=DATASET_CACHE_DIR,
+                  max_bytes=DATASET_CACHE_MAX_BYTES):
+    """Add an entry (a no-op if it already exists), then evict down to max_bytes"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(path):
+        return path
+
+    temp_path = tempfile.mkdtemp(prefix='.tmp-', dir=cache_dir)
+    try:
+        np.save(os.path.join(temp_path, 'X.npy'), np.ascontiguousarray(X, dtype=np.int8))
+        np.save(os.path.join(temp_path, 'y.npy'), np.ascontiguousarray(y, dtype=np.int8))
+        with open(os.path.join(temp_path, 'meta.json'), 'w') as f:
+            json.dump(dict(meta, created=time.strftime('%Y-%m-%dT%H:%M:%S%z')), f)
+        if csv_path is not None:
+            shutil.copyfile(csv_path, os.path.join(temp_path, 'dataset.csv'))
+        # Renaming the finished directory publishes the entry in one step
+        os.rename(temp_path, path)
+    except OSError:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        # Another process may have stored the same entry first
+        if not os.path.exists(path):
+            raise
+
+    evict(cache_dir, max_bytes, keep=key)
+    return path
+
+def cache_entries(cache_dir=DATASET_CACHE_DIR):
+    """List (key, last_used, size_bytes) for every complete entry"""
+    entries = []
+    if not os.path.isdir(cache_dir):
+        return entries
+    for key in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, key)
+        meta_path = os.path.join(path, 'meta.json')
+        if key.startswith('.') or not os.path.exists(meta_path):
+            continue
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        entries.append((key, os.path.getmtime(meta_path), size))
+    return entries
+
+def evict(cache_dir=DATASET_CACHE_DIR, max_bytes=DATASET_CACHE_MAX_BYTES, keep=None):
+    """Remove least recently used entries until the cache fits in max_bytes"""
+    entries = sorted(cache_entries(cache_dir), key=lambda entry: entry[1])
+    total = sum(size for _, _, size in entries)
+    removed = []
+    for key, _, size in entries:
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+        total -= size
+        removed.append(key)
+    return removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the training dataset cache")
+    parser.add_argument('--cache-dir', default=DATASET_CACHE_DIR)
+    parser.add_argument('--list', action='store_true', help="list cached datasets, most recent first")
+    parser.add_argument('--clear', action='store_true', help="remove every cached dataset")
+    args = parser.parse_args()
+
+    if args.clear:
+        removed = evict(args.cache_dir, max_bytes=0)
+        print(f"✅ Removed {len(removed)} cached datasets from {args.cache_dir}")
+        return
+
+    entries = sorted(cache_entries(args.cache_dir), key=lambda entry: -entry[1])
+    for key, last_used, size in entries:
+        used = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_used))
+        print(f"{key[:12]}  {size / 1e6:8.1f} MB  last used {used}")
+    print(f"{len(entries)} cached datasets, {sum(entry[2] for entry in entries) / 1e6:.1f} MB in {args.cache_dir}")
+
+if __name__ == "__main__":
+    main()
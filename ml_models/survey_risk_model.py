@@ -7,320 +7,837 @@ Uses only 4 survey questions to predict risk level
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
 from sklearn.metrics import accuracy_score, classification_report
+import argparse
+import hashlib
+import multiprocessing
+import multiprocessing.connection
 import pickle
 import os
+import shutil
+import time
 import warnings
+from predict_survey_risk import compile_answer_table, save_answer_table, cached_model_data, MODEL_PATH, TABLE_PATH, ARRAYS_MANIFEST_PATH
+from survey_risk_arrays import export_model_arrays
+from survey_risk_dataset_cache import cache_key, load_dataset, store_dataset
+from survey_risk_profile import SurveyProfiler, crosstab_share
+from survey_risk_schema import (
+    QUESTIONS, RISK_LEVELS, FEATURE_COLUMNS, CATEGORIES, CODE_DTYPE,
+    option_codes, encode_answers, encode_frame, matches_schema, schema_encoders
+)
+from survey_risk_registry import MODEL_DIR, REGISTRY_DIR, current_version, load_full_version, next_version, publish_model
+from survey_risk_search import search_hyperparameters, save_search_trace, SEARCH_TRACE_PATH, DEFAULT_CV_FOLDS
+import survey_risk_timing as timing
+from survey_risk_timing import timed
 warnings.filterwarnings('ignore')
 
-def create_survey_dataset(n_samples=500):
-    """Create realistic dataset based on actual investor behavior patterns"""
-    print(f"Creating realistic survey dataset with {n_samples} samples...")
-
-    np.random.seed(42)  # For reproducible results
-
-    data = []
-
-    # Define survey options (matching frontend exactly)
-    risk_options = ['Low', 'Medium', 'High']
-    goal_options = ['Wealth Growth', 'Retirement', 'Short-Term Gains', 'Passive Income']
-    duration_options = ['Short-term (1-3 years)', 'Medium-term (3-7 years)', 'Long-term (7+ years)']
-    experience_options = ['Beginner', 'Intermediate', 'Advanced']
-
-    # Create realistic investor profiles based on research
-    investor_profiles = [
-        # Conservative Retirees (25% of investors)
-        {
-            'profile': 'Conservative Retiree',
-            'weight': 0.25,
-            'risk_dist': [0.8, 0.2, 0.0],  # Mostly Low risk
-            'goal_dist': [0.1, 0.7, 0.0, 0.2],  # Retirement focus
-            'duration_dist': [0.3, 0.5, 0.2],  # Shorter to medium term
-            'experience_dist': [0.4, 0.5, 0.1]  # Less experienced
-        },
-        # Young Aggressive Investors (20% of investors)
-        {
-            'profile': 'Young Aggressive',
-            'weight': 0.20,
-            'risk_dist': [0.0, 0.3, 0.7],  # High risk
-            'goal_dist': [0.8, 0.1, 0.1, 0.0],  # Wealth growth
-            'duration_dist': [0.1, 0.2, 0.7],  # Long term
-            'experience_dist': [0.3, 0.4, 0.3]  # Mixed experience
-        },
-        # Balanced Mid-Career (30% of investors)
-        {
-            'profile': 'Balanced Mid-Career',
-            'weight': 0.30,
-            'risk_dist': [0.1, 0.8, 0.1],  # Medium risk
-            'goal_dist': [0.5, 0.3, 0.1, 0.1],  # Balanced goals
-            'duration_dist': [0.2, 0.4, 0.4],  # Medium to long term
-            'experience_dist': [0.2, 0.6, 0.2]  # Mostly intermediate
-        },
-        # Cautious Beginners (15% of investors)
-        {
-            'profile': 'Cautious Beginner',
-            'weight': 0.15,
-            'risk_dist': [0.7, 0.3, 0.0],  # Low to medium risk
-            'goal_dist': [0.3, 0.4, 0.2, 0.1],  # Conservative goals
-            'duration_dist': [0.4, 0.4, 0.2],  # Shorter term
-            'experience_dist': [0.8, 0.2, 0.0]  # Beginners
-        },
-        # Experienced Traders (10% of investors)
-        {
-            'profile': 'Experienced Trader',
-            'weight': 0.10,
-            'risk_dist': [0.0, 0.2, 0.8],  # High risk
-            'goal_dist': [0.6, 0.0, 0.3, 0.1],  # Growth and short-term
-            'duration_dist': [0.3, 0.3, 0.4],  # Mixed duration
-            'experience_dist': [0.0, 0.2, 0.8]  # Advanced
-        }
-    ]
+# Survey options in frontend order (defined in survey_risk_schema.py)
+RISK_OPTIONS = QUESTIONS['risk']
+GOAL_OPTIONS = QUESTIONS['goal']
+DURATION_OPTIONS = QUESTIONS['investmentDuration']
+EXPERIENCE_OPTIONS = QUESTIONS['experience']
 
-    for i in range(n_samples):
-        # Select investor profile based on weights
-        profile_weights = [p['weight'] for p in investor_profiles]
-        selected_profile = np.random.choice(investor_profiles, p=profile_weights)
-
-        # Generate responses based on selected profile
-        risk = np.random.choice(risk_options, p=selected_profile['risk_dist'])
-        goal = np.random.choice(goal_options, p=selected_profile['goal_dist'])
-        experience = np.random.choice(experience_options, p=selected_profile['experience_dist'])
-
-        # Duration logic based on goal and risk (realistic correlations)
-        if goal == 'Short-Term Gains':
-            # Short-term gains always short duration
-            duration = 'Short-term (1-3 years)'
-        elif goal == 'Retirement':
-            # Retirement planning usually longer term
-            if experience == 'Beginner':
-                duration = np.random.choice(duration_options, p=[0.4, 0.4, 0.2])
-            else:
-                duration = np.random.choice(duration_options, p=[0.1, 0.3, 0.6])
-        elif goal == 'Wealth Growth':
-            # Wealth growth varies by risk tolerance
-            if risk == 'High':
-                duration = np.random.choice(duration_options, p=[0.1, 0.3, 0.6])  # Longer term
-            elif risk == 'Medium':
-                duration = np.random.choice(duration_options, p=[0.2, 0.5, 0.3])  # Medium term
-            else:
-                duration = np.random.choice(duration_options, p=[0.4, 0.4, 0.2])  # Shorter term
-        else:  # Passive Income
-            # Passive income usually medium to long term
-            duration = np.random.choice(duration_options, p=[0.2, 0.5, 0.3])
-
-        # Add some realistic inconsistencies (people aren't always logical)
-        if np.random.random() < 0.1:  # 10% chance of inconsistency
-            if risk == 'Low' and np.random.random() < 0.3:
-                # Some conservative investors still want wealth growth
-                goal = 'Wealth Growth'
-            elif risk == 'High' and np.random.random() < 0.2:
-                # Some aggressive investors are actually beginners
-                experience = 'Beginner'
-        
-        # Calculate realistic risk score using behavioral finance principles
-        risk_score = 0
-
-        # Risk tolerance is the primary factor (50% weight)
-        if risk == 'High':
-            risk_score += 5.0
-        elif risk == 'Medium':
-            risk_score += 2.5
-        # Low adds 0
-
-        # Experience affects confidence and risk capacity (25% weight)
-        if experience == 'Advanced':
-            risk_score += 2.5
-        elif experience == 'Intermediate':
-            risk_score += 1.25
-        # Beginner adds 0
-
-        # Time horizon affects risk capacity (15% weight)
-        if duration == 'Long-term (7+ years)':
-            risk_score += 1.5
-        elif duration == 'Medium-term (3-7 years)':
-            risk_score += 0.75
-        # Short-term adds 0
-
-        # Investment goal affects risk necessity (10% weight)
-        if goal == 'Wealth Growth':
-            risk_score += 1.0
-        elif goal == 'Short-Term Gains':
-            risk_score += 0.5  # Paradoxically, short-term gains often require higher risk
-        elif goal == 'Passive Income':
-            risk_score += 0.25
-        # Retirement adds 0 (conservative)
-
-        # Realistic behavioral adjustments
-        # Young aggressive investors sometimes overestimate risk tolerance
-        if risk == 'High' and experience == 'Beginner':
-            risk_score -= 0.5  # Reduce score for inexperienced high-risk takers
-
-        # Experienced investors with conservative goals
-        if experience == 'Advanced' and goal == 'Retirement':
-            risk_score -= 0.3  # Experienced investors are more realistic about retirement
-
-        # Short-term high risk is often unrealistic
-        if duration == 'Short-term (1-3 years)' and risk == 'High':
-            risk_score -= 0.7  # Penalize unrealistic short-term high risk
-
-        # Add realistic noise (people aren't perfectly consistent)
-        risk_score += np.random.normal(0, 0.2)
-
-        # Determine final risk level with realistic thresholds
-        if risk_score >= 6.5:
-            risk_level = 'High'
-        elif risk_score >= 3.5:
-            risk_level = 'Moderate'
-        else:
-            risk_level = 'Low'
-
-        # Ensure some consistency with stated risk tolerance (80% of the time)
-        if np.random.random() < 0.8:
-            # If there's a big mismatch, adjust towards stated preference
-            if risk == 'High' and risk_level == 'Low':
-                risk_level = 'Moderate'
-            elif risk == 'Low' and risk_level == 'High':
-                risk_level = 'Moderate'
-        
-        # Add realistic edge cases (5% of data)
-        if np.random.random() < 0.05:
-            # Conservative investor forced into growth due to inflation concerns
-            if risk == 'Low' and goal == 'Retirement':
-                goal = 'Wealth Growth'
-                risk_level = 'Moderate'  # Forced to take some risk
-
-            # Experienced investor being very conservative due to market conditions
-            elif experience == 'Advanced' and np.random.random() < 0.5:
-                risk = 'Low'
-                risk_level = 'Low'
-
-            # Beginner overconfident due to recent market gains
-            elif experience == 'Beginner' and np.random.random() < 0.3:
-                risk = 'High'
-                # But actual risk level should be moderate due to inexperience
-                if risk_level == 'High':
-                    risk_level = 'Moderate'
-
-        data.append({
-            'risk': risk,
-            'goal': goal,
-            'investmentDuration': duration,
-            'experience': experience,
-            'risk_level': risk_level
-        })
-
-    df = pd.DataFrame(data)
-
-    # Add data quality checks
-    print(f"Dataset created with {len(df)} samples")
-    print("\n📊 Risk Level Distribution:")
-    risk_counts = df['risk_level'].value_counts()
-    for level, count in risk_counts.items():
-        percentage = (count / len(df)) * 100
-        print(f"  {level}: {count} ({percentage:.1f}%)")
-
-    print("\n📋 Survey Response Patterns:")
-    print("Risk Tolerance Distribution:")
-    risk_tolerance_counts = df['risk'].value_counts()
-    for risk, count in risk_tolerance_counts.items():
-        percentage = (count / len(df)) * 100
-        print(f"  {risk}: {count} ({percentage:.1f}%)")
-
-    print("\nInvestment Goals Distribution:")
-    goal_counts = df['goal'].value_counts()
-    for goal, count in goal_counts.items():
-        percentage = (count / len(df)) * 100
-        print(f"  {goal}: {count} ({percentage:.1f}%)")
-
-    print("\nExperience Level Distribution:")
-    exp_counts = df['experience'].value_counts()
-    for exp, count in exp_counts.items():
-        percentage = (count / len(df)) * 100
-        print(f"  {exp}: {count} ({percentage:.1f}%)")
+# Create realistic investor profiles based on research
+INVESTOR_PROFILES = [
+    # Conservative Retirees (25% of investors)
+    {
+        'profile': 'Conservative Retiree',
+        'weight': 0.25,
+        'risk_dist': [0.8, 0.2, 0.0],  # Mostly Low risk
+        'goal_dist': [0.1, 0.7, 0.0, 0.2],  # Retirement focus
+        'duration_dist': [0.3, 0.5, 0.2],  # Shorter to medium term
+        'experience_dist': [0.4, 0.5, 0.1]  # Less experienced
+    },
+    # Young Aggressive Investors (20% of investors)
+    {
+        'profile': 'Young Aggressive',
+        'weight': 0.20,
+        'risk_dist': [0.0, 0.3, 0.7],  # High risk
+        'goal_dist': [0.8, 0.1, 0.1, 0.0],  # Wealth growth
+        'duration_dist': [0.1, 0.2, 0.7],  # Long term
+        'experience_dist': [0.3, 0.4, 0.3]  # Mixed experience
+    },
+    # Balanced Mid-Career (30% of investors)
+    {
+        'profile': 'Balanced Mid-Career',
+        'weight': 0.30,
+        'risk_dist': [0.1, 0.8, 0.1],  # Medium risk
+        'goal_dist': [0.5, 0.3, 0.1, 0.1],  # Balanced goals
+        'duration_dist': [0.2, 0.4, 0.4],  # Medium to long term
+        'experience_dist': [0.2, 0.6, 0.2]  # Mostly intermediate
+    },
+    # Cautious Beginners (15% of investors)
+    {
+        'profile': 'Cautious Beginner',
+        'weight': 0.15,
+        'risk_dist': [0.7, 0.3, 0.0],  # Low to medium risk
+        'goal_dist': [0.3, 0.4, 0.2, 0.1],  # Conservative goals
+        'duration_dist': [0.4, 0.4, 0.2],  # Shorter term
+        'experience_dist': [0.8, 0.2, 0.0]  # Beginners
+    },
+    # Experienced Traders (10% of investors)
+    {
+        'profile': 'Experienced Trader',
+        'weight': 0.10,
+        'risk_dist': [0.0, 0.2, 0.8],  # High risk
+        'goal_dist': [0.6, 0.0, 0.3, 0.1],  # Growth and short-term
+        'duration_dist': [0.3, 0.3, 0.4],  # Mixed duration
+        'experience_dist': [0.0, 0.2, 0.8]  # Advanced
+    }
+]
+
+# Behavioural noise and inconsistency rates of the generator
+NOISE_SIGMA = 0.2
+INCONSISTENCY_RATE = 0.1
+CONSISTENCY_RATE = 0.8
+EDGE_CASE_RATE = 0.05
+
+DATASET_SEED = 42
+# Bump whenever generate_survey_codes changes what it produces for the same
+# inputs, so cached datasets from the old generator are not reused
+GENERATOR_VERSION = 2
+DATASET_CHUNK_SIZE = 1_000_000
+
+# Share of held-out answers a cascade exit must agree with the full ensemble on
+CASCADE_TARGET_AGREEMENT = 0.99
+
+# Rows per batch when measuring candidate throughput for model selection
+SELECTION_BATCH_ROWS = 1000
+
+# Incremental updates: trees added per update (oldest dropped past the cap),
+# past training rows replayed alongside each new batch, and how many updates
+# pass between full-retrain accuracy comparisons
+INCREMENTAL_TREES = 20
+MAX_FOREST_TREES = 300
+REPLAY_SIZE = 2000
+FULL_RETRAIN_EVERY = 10
+DATASET_PATH = os.path.join(MODEL_DIR, 'survey_risk_dataset.csv')
+# Real labeled outcomes from --update. Only ever appended to (every retrain
+# rewrites DATASET_PATH), and they join the training split of every retrain
+LABELED_ROWS_PATH = os.path.join(MODEL_DIR, 'survey_risk_labeled.csv')
+
+# Indices into the option lists above, used by the vectorized generator;
+# its output is converted to schema codes at the end
+LOW, MEDIUM, HIGH = 0, 1, 2
+WEALTH_GROWTH, RETIREMENT, SHORT_TERM_GAINS, PASSIVE_INCOME = 0, 1, 2, 3
+SHORT_TERM, MEDIUM_TERM, LONG_TERM = 0, 1, 2
+BEGINNER, INTERMEDIATE, ADVANCED = 0, 1, 2
+LEVEL_LOW, LEVEL_MODERATE, LEVEL_HIGH = 0, 1, 2
+
+def sample_categories(rng, distributions, rows):
+    """Draw one category per row from that row's probability distribution"""
+    cumulative = np.cumsum(distributions, axis=1)[rows]
+    draws = rng.random(len(rows))[:, None]
+    codes = (draws >= cumulative).sum(axis=1)
+    # Guard against cumulative sums that round to slightly below 1
+    return np.minimum(codes, cumulative.shape[1] - 1)
+
+def generate_survey_codes(n_samples, rng, profiles=INVESTOR_PROFILES,
+                          noise_sigma=NOISE_SIGMA, inconsistency_rate=INCONSISTENCY_RATE,
+                          consistency_rate=CONSISTENCY_RATE, edge_case_rate=EDGE_CASE_RATE):
+    """Sample survey answers and risk levels as int8 schema code arrays"""
+    # Select investor profile based on weights
+    weights = np.array([p['weight'] for p in profiles], dtype=float)
+    profile = rng.choice(len(profiles), size=n_samples, p=weights / weights.sum())
+
+    # Generate responses based on selected profile
+    risk = sample_categories(rng, np.array([p['risk_dist'] for p in profiles]), profile)
+    goal = sample_categories(rng, np.array([p['goal_dist'] for p in profiles]), profile)
+    experience = sample_categories(rng, np.array([p['experience_dist'] for p in profiles]), profile)
+
+    # Duration logic based on goal and risk (realistic correlations); each
+    # rule picks one of these duration distributions
+    duration_dists = np.array([
+        [1.0, 0.0, 0.0],  # Short-term gains always short duration
+        [0.4, 0.4, 0.2],  # Shorter term
+        [0.1, 0.3, 0.6],  # Longer term
+        [0.2, 0.5, 0.3],  # Medium term
+    ])
+    duration_rule = np.full(n_samples, 3)  # Passive income usually medium to long term
+    duration_rule[goal == SHORT_TERM_GAINS] = 0
+    retirement = goal == RETIREMENT
+    duration_rule[retirement & (experience == BEGINNER)] = 1
+    duration_rule[retirement & (experience != BEGINNER)] = 2
+    wealth_growth = goal == WEALTH_GROWTH
+    duration_rule[wealth_growth & (risk == HIGH)] = 2
+    duration_rule[wealth_growth & (risk == MEDIUM)] = 3
+    duration_rule[wealth_growth & (risk == LOW)] = 1
+    duration = sample_categories(rng, duration_dists, duration_rule)
+
+    # Add some realistic inconsistencies (people aren't always logical)
+    inconsistent = rng.random(n_samples) < inconsistency_rate
+    inconsistency_draw = rng.random(n_samples)
+    # Some conservative investors still want wealth growth
+    goal[inconsistent & (risk == LOW) & (inconsistency_draw < 0.3)] = WEALTH_GROWTH
+    # Some aggressive investors are actually beginners
+    experience[inconsistent & (risk == HIGH) & (inconsistency_draw < 0.2)] = BEGINNER
+
+    # Calculate realistic risk score using behavioral finance principles:
+    # risk tolerance 50%, experience 25%, time horizon 15%, goal 10%
+    risk_score = (
+        np.array([0.0, 2.5, 5.0])[risk]
+        + np.array([0.0, 1.25, 2.5])[experience]
+        + np.array([0.0, 0.75, 1.5])[duration]
+        + np.array([1.0, 0.0, 0.5, 0.25])[goal]
+    )
+
+    # Realistic behavioral adjustments
+    risk_score -= 0.5 * ((risk == HIGH) & (experience == BEGINNER))
+    risk_score -= 0.3 * ((experience == ADVANCED) & (goal == RETIREMENT))
+    risk_score -= 0.7 * ((duration == SHORT_TERM) & (risk == HIGH))
+
+    # Add realistic noise (people aren't perfectly consistent)
+    risk_score += rng.normal(0, noise_sigma, n_samples)
+
+    # Determine final risk level with realistic thresholds
+    risk_level = np.digitize(risk_score, [3.5, 6.5])
+
+    # Ensure some consistency with stated risk tolerance; big mismatches
+    # are adjusted towards the stated preference
+    consistent = rng.random(n_samples) < consistency_rate
+    mismatch = ((risk == HIGH) & (risk_level == LEVEL_LOW)) | ((risk == LOW) & (risk_level == LEVEL_HIGH))
+    risk_level[consistent & mismatch] = LEVEL_MODERATE
+
+    # Add realistic edge cases
+    edge_case = rng.random(n_samples) < edge_case_rate
+    edge_case_draw = rng.random(n_samples)
+    # Conservative investor forced into growth due to inflation concerns
+    forced_growth = edge_case & (risk == LOW) & (goal == RETIREMENT)
+    # Experienced investor being very conservative due to market conditions
+    cautious_expert = edge_case & ~forced_growth & (experience == ADVANCED) & (edge_case_draw < 0.5)
+    # Beginner overconfident due to recent market gains
+    overconfident = edge_case & ~forced_growth & (experience == BEGINNER) & (edge_case_draw < 0.3)
+
+    goal[forced_growth] = WEALTH_GROWTH
+    risk_level[forced_growth] = LEVEL_MODERATE
+    risk[cautious_expert] = LOW
+    risk_level[cautious_expert] = LEVEL_LOW
+    risk[overconfident] = HIGH
+    # But actual risk level should be moderate due to inexperience
+    risk_level[overconfident & (risk_level == LEVEL_HIGH)] = LEVEL_MODERATE
+
+    generated = {
+        'risk': risk,
+        'goal': goal,
+        'investmentDuration': duration,
+        'experience': experience,
+        'risk_level': risk_level
+    }
+    # Frontend-order indices -> compact int8 schema codes
+    return {
+        column: np.array(option_codes(column), dtype=CODE_DTYPE)[indices]
+        for column, indices in generated.items()
+    }
+
+def codes_to_frame(codes):
+    """Turn generated code arrays into a survey DataFrame with categorical columns"""
+    return pd.DataFrame({
+        column: pd.Categorical.from_codes(codes[column], categories=categories)
+        for column, categories in CATEGORIES.items()
+    })
+
+def iter_survey_dataset(n_samples, chunk_size=DATASET_CHUNK_SIZE, seed=DATASET_SEED, **generator_params):
+    """Yield the survey dataset as DataFrames of at most chunk_size rows"""
+    for chunk_index, start in enumerate(range(0, n_samples, chunk_size)):
+        # Every chunk has its own child seed, so any chunk can be regenerated alone
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+        rows = min(chunk_size, n_samples - start)
+        yield codes_to_frame(generate_survey_codes(rows, rng, **generator_params))
+
+def write_survey_dataset(path, n_samples, chunk_size=DATASET_CHUNK_SIZE, seed=DATASET_SEED, **generator_params):
+    """Stream a generated survey dataset to CSV in bounded memory"""
+    written = 0
+    for chunk in iter_survey_dataset(n_samples, chunk_size, seed, **generator_params):
+        chunk.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += len(chunk)
+        print(f"  {written}/{n_samples} rows written to {path}")
+    return written
+
+def print_dataset_profile(profile):
+    """Print the distributions and data quality checks of a dataset profile"""
+    print(f"Dataset created with {profile['rows']} samples")
+    sections = [
+        ("\n📊 Risk Level Distribution:", 'risk_level'),
+        ("\n📋 Survey Response Patterns:\nRisk Tolerance Distribution:", 'risk'),
+        ("\nInvestment Goals Distribution:", 'goal'),
+        ("\nExperience Level Distribution:", 'experience')
+    ]
+    for title, column in sections:
+        print(title)
+        ranked = sorted(profile['marginals'][column].items(), key=lambda item: -item[1]['count'])
+        for value, stats in ranked:
+            print(f"  {value}: {stats['count']} ({stats['share'] * 100:.1f}%)")
 
     print("\n🔍 Data Quality Checks:")
     # Check for realistic correlations
-    high_risk_advanced = len(df[(df['risk'] == 'High') & (df['experience'] == 'Advanced')])
-    high_risk_total = len(df[df['risk'] == 'High'])
-    if high_risk_total > 0:
-        advanced_ratio = (high_risk_advanced / high_risk_total) * 100
-        print(f"  High-risk investors who are Advanced: {advanced_ratio:.1f}% (should be >40%)")
+    advanced_ratio = crosstab_share(profile, 'risk', 'High', 'experience', 'Advanced')
+    if advanced_ratio is not None:
+        print(f"  High-risk investors who are Advanced: {advanced_ratio * 100:.1f}% (should be >40%)")
+
+    long_term_ratio = crosstab_share(profile, 'goal', 'Retirement', 'investmentDuration', 'Long-term (7+ years)')
+    if long_term_ratio is not None:
+        print(f"  Retirement investors with Long-term horizon: {long_term_ratio * 100:.1f}% (should be >50%)")
+
+def create_survey_dataset(n_samples=500, seed=DATASET_SEED, verbose=True):
+    """Create realistic dataset based on actual investor behavior patterns
 
-    retirement_long_term = len(df[(df['goal'] == 'Retirement') & (df['investmentDuration'] == 'Long-term (7+ years)')])
-    retirement_total = len(df[df['goal'] == 'Retirement'])
-    if retirement_total > 0:
-        long_term_ratio = (retirement_long_term / retirement_total) * 100
-        print(f"  Retirement investors with Long-term horizon: {long_term_ratio:.1f}% (should be >50%)")
+    Each chunk is profiled as it is generated (one grouped count per chunk),
+    so the quality report costs no extra scans. The profile is kept in
+    df.attrs['profile'].
+    """
+    if verbose:
+        print(f"Creating realistic survey dataset with {n_samples} samples...")
 
-    print("\n✅ Sample realistic data:")
-    print(df.head(10))
+    profiler = SurveyProfiler(CATEGORIES)
+    chunks = []
+    for chunk in iter_survey_dataset(n_samples, seed=seed):
+        profiler.add_frame(chunk)
+        chunks.append(chunk)
+    df = pd.concat(chunks, ignore_index=True)
+    df.attrs['profile'] = profiler.report()
+
+    if verbose:
+        print_dataset_profile(df.attrs['profile'])
+        print("\n✅ Sample realistic data:")
+        print(df.head(10))
 
     return df
 
-def train_models():
-    """Train 3 different models and select the best one"""
-    print("Training ML models...")
+# Candidate families in selection order, with their default parameters
+CANDIDATE_MODELS = {
+    'RandomForest': (RandomForestClassifier, {'n_estimators': 100, 'random_state': 42}),
+    'LogisticRegression': (LogisticRegression, {'random_state': 42, 'max_iter': 1000}),
+    'SVC': (SVC, {'random_state': 42, 'probability': True})
+}
+
+def build_candidate_models(params=None):
+    """Create the untrained candidate models, in selection order, with optional tuned params"""
+    params = params or {}
+    return {
+        name: cls(**dict(defaults, **params.get(name, {})))
+        for name, (cls, defaults) in CANDIDATE_MODELS.items()
+    }
+
+def fit_and_evaluate(model, X_train, y_train, X_test, y_test):
+    """Fit one model and score it on the held-out split, timing both steps"""
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    evaluate_seconds = time.perf_counter() - started
+
+    return model, accuracy, {
+        'status': 'ok',
+        'fit_seconds': fit_seconds,
+        'evaluate_seconds': evaluate_seconds
+    }
+
+def _candidate_worker(connection, model, X_train, y_train, X_test, y_test):
+    """Run fit_and_evaluate in a child process and send the outcome back"""
+    try:
+        connection.send(('ok', fit_and_evaluate(model, X_train, y_train, X_test, y_test)))
+    except Exception as e:
+        connection.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        connection.close()
+
+def train_candidates(models, X_train, y_train, X_test, y_test, n_workers=None, model_timeout=None):
+    """Train and evaluate candidate models, concurrently when n_workers > 1
+
+    Returns (trained_models, results, timings) with entries in the order of
+    `models`, so the outcome does not depend on scheduling. Every estimator
+    carries its own random_state, which keeps fits identical across worker
+    counts. Models that fail or run past `model_timeout` seconds are left
+    out of the trained models and results and reported in timings.
+    """
+    if n_workers is None:
+        n_workers = min(len(models), os.cpu_count() or 1)
+
+    outcomes = {}
+    if n_workers <= 1 and model_timeout is None:
+        # Sequential in-process training, with nothing to supervise
+        for name, model in models.items():
+            try:
+                outcomes[name] = fit_and_evaluate(model, X_train, y_train, X_test, y_test)
+            except Exception as e:
+                outcomes[name] = (None, None, {'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+    else:
+        # One child process per model so a model past its timeout can be killed
+        pending = list(models.items())
+        running = {}
+        while pending or running:
+            while pending and len(running) < max(n_workers, 1):
+                name, model = pending.pop(0)
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(
+                    target=_candidate_worker,
+                    args=(sender, model, X_train, y_train, X_test, y_test),
+                    daemon=True
+                )
+                process.start()
+                sender.close()
+                running[name] = (process, receiver, time.perf_counter())
+
+            ready = multiprocessing.connection.wait(
+                [receiver for _, receiver, _ in running.values()], timeout=0.1
+            )
+            for name, (process, receiver, started) in list(running.items()):
+                elapsed = time.perf_counter() - started
+                if receiver in ready:
+                    try:
+                        status, payload = receiver.recv()
+                    except EOFError:
+                        status, payload = 'error', f"worker exited with code {process.exitcode}"
+                    process.join()
+                    if status == 'ok':
+                        outcomes[name] = payload
+                    else:
+                        outcomes[name] = (None, None, {'status': 'error', 'error': payload})
+                elif model_timeout is not None and elapsed > model_timeout:
+                    process.terminate()
+                    process.join()
+                    outcomes[name] = (None, None, {'status': 'timeout', 'wall_seconds': elapsed})
+                else:
+                    continue
+                receiver.close()
+                del running[name]
+
+    trained_models = {}
+    results = {}
+    timings = {}
+    for name in models:
+        model, accuracy, model_timing = outcomes[name]
+        timings[name] = model_timing
+        if model is not None:
+            trained_models[name] = model
+            results[name] = accuracy
+    return trained_models, results, timings
+
+def choose_cascade_threshold(confidence, agrees, target_agreement):
+    """Lowest confidence threshold whose accepted rows agree with the ensemble often enough"""
+    if not len(confidence):
+        return None
+    # Walk confidences from high to low; a threshold accepts every row at or above it
+    order = np.argsort(-confidence, kind='stable')
+    sorted_confidence = confidence[order]
+    agreed = np.cumsum(agrees[order])
+    group_ends = np.flatnonzero(np.r_[sorted_confidence[1:] != sorted_confidence[:-1], True])
+    rates = agreed[group_ends] / (group_ends + 1)
+    passing = np.flatnonzero(rates >= target_agreement)
+    if not len(passing):
+        return None
+    return float(sorted_confidence[group_ends[passing[-1]]])
+
+def single_row_costs(trained_models, X_holdout, repeats=20):
+    """Median seconds each model takes to answer one survey (predict + predict_proba)"""
+    single_row = X_holdout[:1]
+    costs = {}
+    for name, model in trained_models.items():
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            model.predict(single_row)
+            model.predict_proba(single_row)
+            samples.append(time.perf_counter() - started)
+        costs[name] = float(np.median(samples))
+    return costs
+
+def learn_cascade(trained_models, X_holdout, target_agreement=CASCADE_TARGET_AGREEMENT, repeats=20, costs=None):
+    """Learn cascade order (by single-row cost) and exit thresholds on held-out data
     
-    # Create dataset
-    df = create_survey_dataset(500)
+    costs (seconds per model, from single_row_costs) are measured here unless
+    the caller already has them.
+    """
+    names = list(trained_models)
+    n_rows = len(X_holdout)
+
+    if costs is None:
+        costs = single_row_costs(trained_models, X_holdout, repeats)
+    order = sorted(names, key=lambda name: (costs[name], names.index(name)))
+
+    predictions = {name: np.asarray(model.predict(X_holdout)) for name, model in trained_models.items()}
+    confidences = {name: model.predict_proba(X_holdout).max(axis=1) for name, model in trained_models.items()}
+
+    # Full ensemble answer: most confident model, first model on ties
+    stacked = np.stack([confidences[name] for name in names])
+    ensemble_model = np.argmax(stacked, axis=0)
+    ensemble = np.array([predictions[names[m]][i] for i, m in enumerate(ensemble_model)])
+
+    # Replay the cascade stage by stage, fixing each threshold on the rows
+    # that are still undecided when that stage runs
+    best_confidence = np.full(n_rows, -np.inf)
+    best_rank = np.full(n_rows, len(names))
+    best_prediction = np.empty(n_rows, dtype=object)
+    cascade_prediction = np.empty(n_rows, dtype=object)
+    answered_at = np.full(n_rows, len(order))
+    remaining = np.ones(n_rows, dtype=bool)
+    thresholds = {}
+    for stage, name in enumerate(order, start=1):
+        rank = names.index(name)
+        better = (confidences[name] > best_confidence) | (
+            (confidences[name] == best_confidence) & (rank < best_rank)
+        )
+        best_confidence[better] = confidences[name][better]
+        best_rank[better] = rank
+        best_prediction[better] = predictions[name][better]
+
+        if stage == len(order):
+            # The last stage has seen every model, so it is the full ensemble
+            thresholds[name] = None
+            cascade_prediction[remaining] = best_prediction[remaining]
+            break
+
+        threshold = choose_cascade_threshold(
+            best_confidence[remaining],
+            best_prediction[remaining] == ensemble[remaining],
+            target_agreement
+        )
+        thresholds[name] = threshold
+        if threshold is not None:
+            exits = remaining & (best_confidence >= threshold)
+            cascade_prediction[exits] = best_prediction[exits]
+            answered_at[exits] = stage
+            remaining &= ~exits
+
+    stage_share = {
+        name: float(np.mean(answered_at == stage)) for stage, name in enumerate(order, start=1)
+    }
+    # Expected cost per survey: every stage up to the answering one runs
+    expected_cost = float(sum(
+        costs[name] * np.mean(answered_at >= stage) for stage, name in enumerate(order, start=1)
+    ))
+    return {
+        'order': order,
+        'thresholds': thresholds,
+        'costs_seconds': costs,
+        'target_agreement': target_agreement,
+        'agreement': float(np.mean(cascade_prediction == ensemble)),
+        'stage_share': stage_share,
+        'expected_cost_seconds': expected_cost,
+        'full_cost_seconds': float(sum(costs.values())),
+        'holdout_rows': n_rows
+    }
+
+def measure_candidates(trained_models, X_holdout, repeats=20, costs=None):
+    """Single-row latency, batch throughput and pickled size of each trained model"""
+    if costs is None:
+        costs = single_row_costs(trained_models, X_holdout, repeats)
+    # Tile the held-out rows up to a realistic batch
+    batch = X_holdout.iloc[np.arange(SELECTION_BATCH_ROWS) % len(X_holdout)]
+    measurements = {}
+    for name, model in trained_models.items():
+        batch_samples = []
+        for _ in range(max(3, repeats // 5)):
+            started = time.perf_counter()
+            model.predict(batch)
+            model.predict_proba(batch)
+            batch_samples.append(time.perf_counter() - started)
+        measurements[name] = {
+            'single_row_ms': costs[name] * 1000,
+            'batch_rows_per_sec': SELECTION_BATCH_ROWS / float(np.median(batch_samples)),
+            'batch_rows': SELECTION_BATCH_ROWS,
+            'serialized_bytes': len(pickle.dumps(model))
+        }
+    return measurements
+
+def pareto_front(results, measurements):
+    """Models no other model beats on both held-out accuracy and single-row latency"""
+    front = []
+    for name in results:
+        dominated = any(
+            results[other] >= results[name]
+            and measurements[other]['single_row_ms'] <= measurements[name]['single_row_ms']
+            and (results[other] > results[name]
+                 or measurements[other]['single_row_ms'] < measurements[name]['single_row_ms'])
+            for other in results if other != name
+        )
+        if not dominated:
+            front.append(name)
+    return front
+
+def select_model(results, measurements, latency_budget_ms=None, accuracy_tolerance=0.0):
+    """Pick the best model from the accuracy/latency Pareto front
+
+    Without a budget or tolerance this is plain max accuracy (first model on
+    ties). A latency budget keeps only front models whose single-row latency
+    fits it (the fastest model if none does); an accuracy tolerance then
+    takes the fastest model within that distance of the best accuracy left.
+    """
+    if latency_budget_ms is None and not accuracy_tolerance:
+        return max(results, key=results.get)
+
+    candidates = pareto_front(results, measurements)
+    if latency_budget_ms is not None:
+        within_budget = [name for name in candidates if measurements[name]['single_row_ms'] <= latency_budget_ms]
+        if not within_budget:
+            fastest = min(candidates, key=lambda name: measurements[name]['single_row_ms'])
+            print(f"⚠️  No model answers within {latency_budget_ms:.2f} ms, using the fastest ({fastest})")
+            within_budget = [fastest]
+        candidates = within_budget
+    best_accuracy = max(results[name] for name in candidates)
+    eligible = [name for name in candidates if results[name] >= best_accuracy - accuracy_tolerance]
+    return min(eligible, key=lambda name: measurements[name]['single_row_ms'])
+
+def print_cascade(cascade):
+    """Print the learned cascade and how it compares to the full ensemble"""
+    print("\nModel Cascade (cheapest first):")
+    for stage, name in enumerate(cascade['order'], start=1):
+        threshold = cascade['thresholds'][name]
+        exit_rule = "final stage" if threshold is None and stage == len(cascade['order']) else (
+            "never exits" if threshold is None else f"exit at confidence >= {threshold:.3f}")
+        print(f"  {stage}. {name}: {cascade['costs_seconds'][name] * 1000:.2f} ms, {exit_rule}, "
+              f"answers {cascade['stage_share'][name] * 100:.1f}% of held-out rows")
+    print(f"  Agreement with full ensemble: {cascade['agreement'] * 100:.1f}% "
+          f"(target {cascade['target_agreement'] * 100:.1f}%)")
+    print(f"  Expected cost: {cascade['expected_cost_seconds'] * 1000:.2f} ms "
+          f"vs {cascade['full_cost_seconds'] * 1000:.2f} ms for all models")
+
+def encode_labeled_rows(df, model_data):
+    """Encode dataset rows to schema codes, as a frame like train_models fits on"""
+    feature_columns = model_data['feature_columns']
+    return pd.DataFrame(encode_frame(df, feature_columns), columns=feature_columns)
+
+def heldout_split(model_data, df):
+    """Rebuild the exact train/held-out split train_models evaluated on
+
+    Only the rows train_models generated take part; labeled rows from
+    LABELED_ROWS_PATH only ever train and never enter the held-out set.
+    """
+    base_rows = model_data.get('incremental', {}).get('base_rows', len(df))
+    df = df.iloc[:base_rows]
+    # Splitting row positions gives the same permutation as splitting the frame
+    train_rows, test_rows = train_test_split(
+        np.arange(base_rows), test_size=0.2, random_state=42, stratify=df['risk_level']
+    )
+    X_encoded = encode_labeled_rows(df, model_data)
+    y = df['risk_level'].to_numpy()
+    return X_encoded.iloc[train_rows], X_encoded.iloc[test_rows], y[train_rows], y[test_rows], test_rows
+
+def dataset_digest(X_codes, labels):
+    """Fingerprint of an encoded dataset, to tell whether a CSV still holds it"""
+    digest = hashlib.sha256(np.ascontiguousarray(X_codes, dtype=CODE_DTYPE).tobytes())
+    digest.update('\n'.join(map(str, labels)).encode())
+    return digest.hexdigest()
+
+def training_dataset(model_data):
+    """The generated rows the models were trained and held out on, read from DATASET_PATH
+
+    Every train_models run overwrites DATASET_PATH and survey_risk_chunked.py
+    never writes it, so it is only used while it still matches the digest
+    train_models recorded; otherwise this raises instead of replaying or
+    scoring against somebody else's rows.
+    """
+    training = model_data.get('training')
+    if training is None:
+        print(f"⚠️  Models carry no training record; assuming {DATASET_PATH} is their dataset")
+        return pd.read_csv(DATASET_PATH)
+    if training['mode'] != 'generated':
+        raise ValueError(f"Models trained in {training['mode']} mode on {training['source']} keep no "
+                         f"training rows to update from; retrain them with the new rows instead")
+
+    df = pd.read_csv(DATASET_PATH).iloc[:training['rows']] if os.path.exists(DATASET_PATH) else None
+    if (df is None or len(df) != training['rows']
+            or dataset_digest(encode_labeled_rows(df, model_data).to_numpy(), df['risk_level']) != training['digest']):
+        raise ValueError(f"{DATASET_PATH} no longer holds dataset {training['dataset_key'][:12]} the models "
+                         f"were trained on; retrain them before updating")
+    return df
+
+def load_current_model_data():
+    """Full model_data of the served model: the current registry version, else the pickle"""
+    if current_version() is None:
+        with open(MODEL_PATH, 'rb') as f:
+            return pickle.load(f)
+    model_data = load_full_version()
+    if matches_schema(model_data['encoders']):
+        model_data['encoders'] = schema_encoders(model_data['feature_columns'])
+    return model_data
+
+def learn_cascade_command(target_agreement=CASCADE_TARGET_AGREEMENT):
+    """Learn the cascade for the served models on their held-out split"""
+    model_data = load_current_model_data()
+    # Both trainers and every update keep their held-out rows
+    if 'incremental' in model_data:
+        X_test = pd.DataFrame(model_data['incremental']['holdout_X'], columns=model_data['feature_columns'])
+    elif 'holdout_X' in model_data:
+        X_test = pd.DataFrame(model_data['holdout_X'], columns=model_data['feature_columns'])
+    else:
+        _, X_test, _, _, _ = heldout_split(model_data, training_dataset(model_data))
+
+    model_data['cascade'] = learn_cascade(model_data['all_models'], X_test, target_agreement)
+    print_cascade(model_data['cascade'])
+
+    publish_artifacts(model_data)
+
+def save_model_data(model_data, model_path=MODEL_PATH):
+    """Pickle the models atomically so hot-reloading readers never see a partial file"""
+    temp_path = f"{model_path}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump(model_data, f)
+    os.replace(temp_path, model_path)
+
+def publish_artifacts(model_data):
+    """Save the pickle, array artifact and answer table, then publish a registry version
+
+    The version is assigned first so every artifact records the one it
+    belongs to and predictions made from any of them report it.
+    """
+    model_data['model_version'] = next_version()
+    with timed('train.save_pickle'):
+        save_model_data(model_data)
+    print(f"✅ Models saved to {MODEL_PATH}")
     
-    # Prepare features and target
-    feature_columns = ['risk', 'goal', 'investmentDuration', 'experience']
-    X = df[feature_columns]
-    y = df['risk_level']
+    # Flat array export for fast, shareable NumPy-only loading
+    with timed('train.export_arrays'):
+        manifest = export_model_arrays(model_data, source_path=MODEL_PATH)
+    print(f"✅ Array artifact saved to {ARRAYS_MANIFEST_PATH} + {manifest['data_file']}")
     
-    # Encode categorical features
-    encoders = {}
-    X_encoded = X.copy()
+    # Precompile answers for every survey combination so serving skips sklearn
+    with timed('train.compile_table'):
+        answer_table = compile_answer_table(model_data)
+        save_answer_table(answer_table)
+    print(f"✅ Answer table with {len(answer_table['entries'])} entries saved to {TABLE_PATH}")
     
-    for column in feature_columns:
-        encoders[column] = LabelEncoder()
-        X_encoded[column] = encoders[column].fit_transform(X[column])
+    with timed('train.publish'):
+        publish_model(model_data, answer_table)
+    print(f"✅ Published as version {model_data['model_version']} in {REGISTRY_DIR}")
+    return answer_table
+
+def dataset_cache_params(n_samples, seed=DATASET_SEED):
+    """Everything that determines the generated dataset, hashed into its cache key"""
+    return {
+        'generator_version': GENERATOR_VERSION,
+        'n_samples': n_samples,
+        'seed': seed,
+        'chunk_size': DATASET_CHUNK_SIZE,
+        'profiles': INVESTOR_PROFILES,
+        'options': [RISK_OPTIONS, GOAL_OPTIONS, DURATION_OPTIONS, EXPERIENCE_OPTIONS, RISK_LEVELS],
+        'noise_sigma': NOISE_SIGMA,
+        'inconsistency_rate': INCONSISTENCY_RATE,
+        'consistency_rate': CONSISTENCY_RATE,
+        'edge_case_rate': EDGE_CASE_RATE
+    }
+
+def cached_training_data(cached, feature_columns):
+    """Rebuild the encoded features and labels from a dataset cache entry"""
+    meta = cached['meta']
+    X_encoded = pd.DataFrame(np.asarray(cached['X'], dtype=CODE_DTYPE), columns=feature_columns)
+    y = pd.Series(pd.Categorical.from_codes(cached['y'], categories=meta['labels']), name='risk_level')
+    return X_encoded, y
+
+def train_models(n_samples=500, n_workers=None, model_timeout=None, cascade_agreement=CASCADE_TARGET_AGREEMENT,
+                 dataset_cache=True, search_budget=None, search_cv=DEFAULT_CV_FOLDS, search_jobs=None,
+                 latency_budget_ms=None, accuracy_tolerance=0.0):
+    """Train 3 different models and select the best one"""
+    print("Training ML models...")
+    timing.begin()
+    feature_columns = list(FEATURE_COLUMNS)
+    # Answers are encoded with the fixed schema codes, never fitted
+    encoders = schema_encoders(feature_columns)
+    
+    # Reuse an identical, already encoded dataset when one is cached
+    dataset_key = cache_key(dataset_cache_params(n_samples))
+    cached = load_dataset(dataset_key) if dataset_cache else None
+    if cached is not None:
+        with timed('train.load_cached_dataset'):
+            X_encoded, y = cached_training_data(cached, feature_columns)
+        print(f"✅ Using cached dataset {dataset_key[:12]} with {len(y)} samples")
+    else:
+        # Create dataset
+        with timed('train.generate_dataset'):
+            df = create_survey_dataset(n_samples)
+        
+        # Prepare features and target; the categorical columns already hold
+        # schema codes, so encoding is a view of their int8 codes
+        y = df['risk_level']
+        with timed('train.encode'):
+            X_encoded = encode_labeled_rows(df, {'feature_columns': feature_columns})
     
     # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X_encoded, y, test_size=0.2, random_state=42, stratify=y
-    )
+    with timed('train.split'):
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_encoded, y, test_size=0.2, random_state=42, stratify=y
+        )
     
-    # Define models
-    models = {
-        'RandomForest': RandomForestClassifier(n_estimators=100, random_state=42),
-        'LogisticRegression': LogisticRegression(random_state=42, max_iter=1000),
-        'SVC': SVC(random_state=42, probability=True)
-    }
+    # Real labeled outcomes train every model but stay out of the held-out
+    # set, so accuracies remain comparable across retrains
+    labeled = read_labeled_history(feature_columns)
+    if not labeled.empty:
+        X_train = pd.concat([X_train, encode_labeled_rows(labeled, {'feature_columns': feature_columns})],
+                            ignore_index=True)
+        y_train = pd.concat([
+            y_train.reset_index(drop=True),
+            pd.Series(pd.Categorical(labeled['risk_level'], categories=y.cat.categories), name='risk_level')
+        ], ignore_index=True)
+        print(f"✅ Training on {len(labeled)} labeled rows from {LABELED_ROWS_PATH} as well")
+    
+    # Tune hyperparameters on the training split only, within the time budget
+    search = None
+    if search_budget:
+        print(f"\nSearching hyperparameters for up to {search_budget:.0f}s...")
+        with timed('train.search'):
+            search = search_hyperparameters(CANDIDATE_MODELS, X_train, y_train, search_budget,
+                                            cv=search_cv, n_jobs=search_jobs)
+        save_search_trace(search)
+        for name, params in search['best_params'].items():
+            print(f"  {name}: {search['cv_scores'][name]:.3f} CV accuracy with {params}")
+        print(f"✅ Search finished in {search['elapsed_seconds']:.1f}s "
+              f"({len(search['trace'])} evaluations), trace saved to {SEARCH_TRACE_PATH}")
     
     # Train and evaluate models
-    results = {}
-    trained_models = {}
+    models = build_candidate_models(search['best_params'] if search else None)
+    with timed('train.candidates'):
+        trained_models, results, timings = train_candidates(
+            models, X_train, y_train, X_test, y_test,
+            n_workers=n_workers, model_timeout=model_timeout
+        )
     
     print("\nModel Training Results:")
     print("=" * 50)
     
-    for name, model in models.items():
-        # Train model
-        model.fit(X_train, y_train)
-        
-        # Make predictions
-        y_pred = model.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
-        
-        # Store results
-        results[name] = accuracy
-        trained_models[name] = model
-        
-        print(f"{name}: {accuracy:.3f} accuracy")
+    for name, model_timing in timings.items():
+        if model_timing['status'] == 'ok':
+            print(f"{name}: {results[name]:.3f} accuracy "
+                  f"(fit {model_timing['fit_seconds']:.2f}s, evaluate {model_timing['evaluate_seconds']:.2f}s)")
+            # Measured inside the worker, so they join the record by hand
+            timing.record(f'train.model.{name}.fit', model_timing['fit_seconds'] * 1000)
+            timing.record(f'train.model.{name}.evaluate', model_timing['evaluate_seconds'] * 1000)
+        elif model_timing['status'] == 'timeout':
+            print(f"{name}: timed out after {model_timing['wall_seconds']:.1f}s")
+        else:
+            print(f"{name}: failed ({model_timing['error']})")
     
-    # Select best model
-    best_model_name = max(results, key=results.get)
+    if not results:
+        raise RuntimeError("No candidate model finished training")
+    
+    # Measure inference cost and size, then select best model
+    # Single-row costs are measured once and shared by selection and the cascade
+    with timed('train.measure_candidates'):
+        costs = single_row_costs(trained_models, X_test)
+        measurements = measure_candidates(trained_models, X_test, costs=costs)
+    front = pareto_front(results, measurements)
+    print("\nInference Cost (single row / batch / pickled size):")
+    for name, measurement in measurements.items():
+        print(f"  {name}: {measurement['single_row_ms']:.2f} ms, "
+              f"{measurement['batch_rows_per_sec']:.0f} rows/s, {measurement['serialized_bytes'] / 1024:.0f} KB"
+              f"{' (Pareto front)' if name in front else ''}")
+    
+    best_model_name = select_model(results, measurements, latency_budget_ms, accuracy_tolerance)
     best_model = trained_models[best_model_name]
     best_accuracy = results[best_model_name]
     
     print(f"\n✅ Best Model: {best_model_name} with {best_accuracy:.3f} accuracy")
     
+    # Learn the cheap-first cascade on the held-out split
+    with timed('train.learn_cascade'):
+        cascade = learn_cascade(trained_models, X_test, cascade_agreement, costs=costs)
+    print_cascade(cascade)
+    
     # Save models and encoders
     model_data = {
         'best_model': best_model,
@@ -329,49 +846,74 @@ def train_models():
         'all_models': trained_models,
         'encoders': encoders,
         'feature_columns': feature_columns,
-        'results': results
+        'results': results,
+        'measurements': measurements,
+        'selection': {
+            'pareto_front': front,
+            'latency_budget_ms': latency_budget_ms,
+            'accuracy_tolerance': accuracy_tolerance
+        },
+        'timings': timings,
+        'cascade': cascade,
+        'labeled_rows': len(labeled),
+        # What --update and --learn-cascade need, so they never guess from DATASET_PATH
+        'training': {
+            'mode': 'generated',
+            'dataset_key': dataset_key,
+            'rows': len(y),
+            'digest': dataset_digest(X_encoded.to_numpy(), y)
+        },
+        'holdout_X': X_test.to_numpy()
     }
+    if search:
+        model_data['search'] = {key: value for key, value in search.items() if key != 'trace'}
+        model_data['search']['trace_path'] = SEARCH_TRACE_PATH
     
-    with open('survey_risk_model.pkl', 'wb') as f:
-        pickle.dump(model_data, f)
-    
-    print(f"✅ Models saved to survey_risk_model.pkl")
+    publish_artifacts(model_data)
     
     # Save dataset for reference
-    df.to_csv('survey_risk_dataset.csv', index=False)
-    print(f"✅ Dataset saved to survey_risk_dataset.csv")
+    with timed('train.save_dataset'):
+        if cached is not None:
+            temp_path = f"{DATASET_PATH}.tmp"
+            shutil.copyfile(cached['csv_path'], temp_path)
+            os.replace(temp_path, DATASET_PATH)
+        else:
+            df.to_csv(DATASET_PATH, index=False)
+            if dataset_cache:
+                meta = {
+                    'params': dataset_cache_params(n_samples),
+                    'feature_columns': feature_columns,
+                    'classes': {column: [str(value) for value in encoders[column].classes_] for column in feature_columns},
+                    'labels': [str(label) for label in y.cat.categories]
+                }
+                store_dataset(dataset_key, X_encoded.to_numpy(), y.cat.codes.to_numpy(), meta, csv_path=DATASET_PATH)
+    print(f"✅ Dataset saved to {DATASET_PATH}")
     
+    timing.emit(timing.end(), force=True, n_samples=n_samples)
     return model_data
 
 def predict_risk(survey_responses):
     """Predict risk level from survey responses"""
     try:
-        # Load trained model
-        with open('survey_risk_model.pkl', 'rb') as f:
-            model_data = pickle.load(f)
+        # Load the served model from the shared in-memory cache
+        model_data = cached_model_data()
         
-        best_model = model_data['best_model']
-        encoders = model_data['encoders']
+        best_model = model_data['all_models'][model_data['best_model_name']]
         feature_columns = model_data['feature_columns']
         
-        # Prepare input data
-        input_data = pd.DataFrame([survey_responses])
-        
-        # Encode features
-        for column in feature_columns:
-            if column in input_data.columns:
-                try:
-                    input_data[column] = encoders[column].transform(input_data[column])
-                except ValueError:
-                    # Handle unseen categories
-                    print(f"Warning: Unseen category in {column}, using most common value")
-                    input_data[column] = 0
+        # Encode features with the schema codes
+        codes = encode_answers(survey_responses, feature_columns)
+        for column, code in zip(feature_columns, codes):
+            if code < 0:
+                # Handle unseen categories
+                print(f"Warning: Unseen category in {column}, using most common value")
+        input_data = pd.DataFrame([[max(code, 0) for code in codes]], columns=feature_columns)
         
         # Make prediction
-        prediction = best_model.predict(input_data[feature_columns])[0]
+        prediction = best_model.predict(input_data)[0]
         
         # Get prediction probabilities
-        probabilities = best_model.predict_proba(input_data[feature_columns])[0]
+        probabilities = best_model.predict_proba(input_data)[0]
         confidence = max(probabilities)
         
         # Get class names
@@ -389,9 +931,252 @@ def predict_risk(survey_responses):
         print(f"Error in prediction: {e}")
         return None
 
-if __name__ == "__main__":
+def read_labeled_rows(path, model_data):
+    """Read new labeled surveys, dropping rows the schema cannot represent"""
+    columns = model_data['feature_columns'] + ['risk_level']
+    df = pd.read_csv(path, dtype='category')
+    missing_columns = [column for column in columns if column not in df.columns]
+    if missing_columns:
+        raise ValueError(f"{path} is missing columns {missing_columns}")
+
+    known = (encode_frame(df, columns) >= 0).all(axis=1)
+    if not known.all():
+        print(f"⚠️  Skipping {int((~known).sum())} rows with unknown answers or labels")
+    return df.loc[known, columns].astype(str).reset_index(drop=True)
+
+def read_labeled_history(feature_columns):
+    """Every labeled row --update has stored so far (an empty frame before the first)"""
+    if not os.path.exists(LABELED_ROWS_PATH):
+        return pd.DataFrame(columns=list(feature_columns) + ['risk_level'])
+    return read_labeled_rows(LABELED_ROWS_PATH, {'feature_columns': list(feature_columns)})
+
+def append_labeled_rows(df):
+    """Add labeled rows to LABELED_ROWS_PATH, which nothing ever rewrites"""
+    write_header = not os.path.exists(LABELED_ROWS_PATH) or os.path.getsize(LABELED_ROWS_PATH) == 0
+    with open(LABELED_ROWS_PATH, 'a', newline='') as f:
+        df.to_csv(f, header=write_header, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+def init_incremental_state(model_data):
+    """Seed the replay buffer and held-out set from the data train_models trained on"""
+    df = training_dataset(model_data)
+    X_train, X_test, y_train, y_test, test_rows = heldout_split(model_data, df)
+    # The labeled rows the models were trained on count as seen training rows
+    labeled = read_labeled_history(model_data['feature_columns']).iloc[:model_data.get('labeled_rows', 0)]
+    X_seen = np.vstack([X_train.to_numpy(), encode_labeled_rows(labeled, model_data).to_numpy()])
+    y_seen = np.concatenate([y_train, labeled['risk_level'].to_numpy(dtype=object)])
+    rng = np.random.default_rng(DATASET_SEED)
+    keep = np.sort(rng.permutation(len(X_seen))[:REPLAY_SIZE])
+    return {
+        'base_rows': len(df),
+        'holdout_rows': test_rows,
+        'holdout_X': X_test.to_numpy(),
+        'holdout_y': y_test,
+        'replay_X': X_seen[keep],
+        'replay_y': y_seen[keep],
+        'rows_seen': len(X_seen),
+        'updates': 0,
+        'history': []
+    }
+
+def update_replay(state, X_new, y_new, rng):
+    """Reservoir-sample new rows into the replay buffer (uniform over every row seen)"""
+    replay_X, replay_y = list(state['replay_X']), list(state['replay_y'])
+    seen = state['rows_seen']
+    for row, label in zip(X_new, y_new):
+        seen += 1
+        if len(replay_X) < REPLAY_SIZE:
+            replay_X.append(row)
+            replay_y.append(label)
+        else:
+            slot = rng.integers(seen)
+            if slot < REPLAY_SIZE:
+                replay_X[slot] = row
+                replay_y[slot] = label
+    state['replay_X'] = np.array(replay_X, dtype=CODE_DTYPE)
+    state['replay_y'] = np.array(replay_y, dtype=object)
+    state['rows_seen'] = seen
+
+def update_model(model, X_new, y_new, X_fit, y_fit):
+    """Fold a batch into one trained model in place; returns how it was updated
+
+    Estimators with partial_fit see only the new rows. Forests grow
+    INCREMENTAL_TREES trees fit on the batch plus the replay buffer, keeping
+    at most MAX_FOREST_TREES of the newest trees; other warm-startable models
+    continue from their current solution and the rest refit on batch plus
+    replay. Either way the cost is bounded by the batch and REPLAY_SIZE.
+    """
+    if hasattr(model, 'partial_fit'):
+        model.partial_fit(X_new, y_new, classes=model.classes_)
+        return 'partial_fit'
+
+    if set(np.unique(y_fit)) != set(model.classes_):
+        raise ValueError("New rows plus the replay buffer must cover every risk level")
+
+    if isinstance(model, RandomForestClassifier):
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + INCREMENTAL_TREES)
+        model.fit(X_fit, y_fit)
+        if len(model.estimators_) > MAX_FOREST_TREES:
+            model.estimators_ = model.estimators_[-MAX_FOREST_TREES:]
+        model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+        return 'warm_start_trees'
+
+    if 'warm_start' in model.get_params():
+        model.set_params(warm_start=True)
+        model.fit(X_fit, y_fit)
+        model.set_params(warm_start=False)
+        return 'warm_start'
+
+    model.fit(X_fit, y_fit)
+    return 'refit_with_replay'
+
+def full_retrain_results(model_data, n_workers=None):
+    """Accuracy of freshly trained candidates on the whole history, same held-out set"""
+    state = model_data['incremental']
+    df = training_dataset(model_data).iloc[:state['base_rows']]
+    training = np.ones(len(df), dtype=bool)
+    training[state['holdout_rows']] = False
+    # Generated training rows plus every labeled row stored so far
+    history = pd.concat([df[training], read_labeled_history(model_data['feature_columns'])], ignore_index=True)
+    X_test = pd.DataFrame(state['holdout_X'], columns=model_data['feature_columns'])
+    _, results, _ = train_candidates(
+        build_candidate_models(), encode_labeled_rows(history, model_data), history['risk_level'].astype(str),
+        X_test, state['holdout_y'], n_workers=n_workers
+    )
+    return results
+
+def update_models(new_rows_path, compare_full_retrain=None, full_retrain_every=FULL_RETRAIN_EVERY,
+                  n_workers=None, cascade_agreement=CASCADE_TARGET_AGREEMENT):
+    """Fold new labeled rows into the served models and publish them as a new version"""
+    model_data = load_current_model_data()
+    feature_columns = model_data['feature_columns']
+    if 'incremental' not in model_data:
+        model_data['incremental'] = init_incremental_state(model_data)
+    state = model_data['incremental']
+
+    new_df = read_labeled_rows(new_rows_path, model_data)
+    if new_df.empty:
+        print("No usable rows to add")
+        return model_data
+    # The registry version this update will be published as
+    version = next_version()
+    print(f"Updating models to version {version} with {len(new_df)} new rows...")
+
+    X_new = encode_labeled_rows(new_df, model_data)
+    y_new = new_df['risk_level'].to_numpy(dtype=object)
+    X_fit = pd.DataFrame(np.vstack([state['replay_X'], X_new.to_numpy()]), columns=feature_columns)
+    y_fit = np.concatenate([state['replay_y'], y_new])
+    X_test = pd.DataFrame(state['holdout_X'], columns=feature_columns)
+
+    results = {}
+    methods = {}
+    timings = {}
+    for name, model in model_data['all_models'].items():
+        started = time.perf_counter()
+        methods[name] = update_model(model, X_new, y_new, X_fit, y_fit)
+        fit_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        results[name] = accuracy_score(state['holdout_y'], model.predict(X_test))
+        timings[name] = {
+            'status': 'ok',
+            'fit_seconds': fit_seconds,
+            'evaluate_seconds': time.perf_counter() - started
+        }
+        print(f"{name}: {results[name]:.3f} accuracy ({methods[name]}, {fit_seconds:.2f}s)")
+
+    # The replay stream is seeded per version so reruns are reproducible
+    update_replay(state, X_new.to_numpy(), y_new, np.random.default_rng([DATASET_SEED, version]))
+    state['updates'] += 1
+
+    best_model_name = max(results, key=results.get)
+    model_data.update({
+        'best_model': model_data['all_models'][best_model_name],
+        'best_model_name': best_model_name,
+        'best_accuracy': results[best_model_name],
+        'results': results,
+        'timings': timings,
+        'cascade': learn_cascade(model_data['all_models'], X_test, cascade_agreement)
+    })
+    print(f"\n✅ Best Model: {best_model_name} with {results[best_model_name]:.3f} accuracy")
+
+    # New rows are stored before the comparison so a full retrain sees them too
+    append_labeled_rows(new_df)
+    history_entry = {'version': version, 'rows': len(new_df), 'results': results, 'methods': methods}
+    if compare_full_retrain is None:
+        compare_full_retrain = bool(full_retrain_every) and state['updates'] % full_retrain_every == 0
+    if compare_full_retrain:
+        print("\nFull retrain comparison on the same held-out set:")
+        full_results = full_retrain_results(model_data, n_workers)
+        for name, accuracy in full_results.items():
+            print(f"  {name}: incremental {results.get(name, float('nan')):.3f} vs full retrain {accuracy:.3f}")
+        history_entry['full_retrain_results'] = full_results
+    state['history'].append(history_entry)
+
+    # The registry keeps every version with its incremental state
+    publish_artifacts(model_data)
+    return model_data
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the survey risk models")
+    parser.add_argument('--generate', type=int, metavar='N_SAMPLES',
+                        help="only write a generated dataset of N_SAMPLES rows to --output")
+    parser.add_argument('--output', default=DATASET_PATH,
+                        help="CSV path for --generate")
+    parser.add_argument('--chunk-size', type=int, default=DATASET_CHUNK_SIZE,
+                        help="rows generated and written per chunk")
+    parser.add_argument('--seed', type=int, default=DATASET_SEED)
+    parser.add_argument('--samples', type=int, default=500,
+                        help="size of the generated training dataset")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes used to train candidate models (default: one per model, up to the CPU count)")
+    parser.add_argument('--model-timeout', type=float, default=None,
+                        help="wall-clock seconds each candidate model may train before it is dropped")
+    parser.add_argument('--no-dataset-cache', action='store_true',
+                        help="always generate the training dataset instead of reusing a cached one")
+    parser.add_argument('--cascade-agreement', type=float, default=CASCADE_TARGET_AGREEMENT,
+                        help="held-out agreement with the full ensemble each cascade exit must reach")
+    parser.add_argument('--latency-budget-ms', type=float, default=None,
+                        help="select the most accurate Pareto-front model answering one survey within this latency")
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.0,
+                        help="select the fastest Pareto-front model within this held-out accuracy of the best")
+    parser.add_argument('--search-budget', type=float, default=None, metavar='SECONDS',
+                        help="tune hyperparameters by successive halving within this wall-clock budget")
+    parser.add_argument('--search-cv', type=int, default=DEFAULT_CV_FOLDS, help="cross-validation folds for --search-budget")
+    parser.add_argument('--search-jobs', type=int, default=None,
+                        help="processes running CV folds in parallel (default: one per fold, up to the CPU count)")
+    parser.add_argument('--learn-cascade', action='store_true',
+                        help="only learn the cascade for the saved models from the saved dataset")
+    parser.add_argument('--update', metavar='NEW_ROWS_CSV',
+                        help="fold labeled rows (survey_risk_dataset.csv schema) into the saved models")
+    parser.add_argument('--compare-full-retrain', action='store_true',
+                        help="with --update, also compare against a full retrain on the whole history")
+    parser.add_argument('--full-retrain-every', type=int, default=FULL_RETRAIN_EVERY,
+                        help="updates between automatic full-retrain comparisons (0 disables them)")
+    args = parser.parse_args()
+
+    if args.learn_cascade:
+        learn_cascade_command(args.cascade_agreement)
+        return
+
+    if args.update:
+        update_models(args.update, compare_full_retrain=args.compare_full_retrain or None,
+                      full_retrain_every=args.full_retrain_every, n_workers=args.workers,
+                      cascade_agreement=args.cascade_agreement)
+        return
+
+    if args.generate is not None:
+        print(f"Generating {args.generate} survey rows in chunks of {args.chunk_size}...")
+        write_survey_dataset(args.output, args.generate, args.chunk_size, args.seed)
+        print(f"✅ Dataset saved to {args.output}")
+        return
+
     # Train models
-    model_data = train_models()
+    model_data = train_models(n_samples=args.samples, n_workers=args.workers,
+                              model_timeout=args.model_timeout, cascade_agreement=args.cascade_agreement,
+                              dataset_cache=not args.no_dataset_cache, search_budget=args.search_budget,
+                              search_cv=args.search_cv, search_jobs=args.search_jobs,
+                              latency_budget_ms=args.latency_budget_ms, accuracy_tolerance=args.accuracy_tolerance)
     
     # Test prediction
     test_survey = {
@@ -409,3 +1194,6 @@ if __name__ == "__main__":
         print(f"Method: {result['method']}")
     else:
         print("Prediction failed")
+
+if __name__ == "__main__":
+    main()
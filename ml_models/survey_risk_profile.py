@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Single-pass profiling of survey datasets
+Usage: python survey_risk_profile.py survey_risk_dataset.csv [--chunk-size N] [--json]
+
+Every row is folded into one joint count tensor over the integer codes of
+all columns (answers plus risk_level) with a single np.bincount. Marginal
+distributions, pairwise crosstabs and the label distribution of every answer
+combination are sums over that tensor, so one grouped pass replaces a scan
+per statistic. Profilers accumulate chunk by chunk, so files larger than
+memory can be profiled. Reports are plain dicts (JSON-ready); nothing is
+printed unless format_profile is asked for.
+"""
+
+import sys
+import json
+import argparse
+import itertools
+import numpy as np
+
+class SurveyProfiler:
+    """Accumulate joint answer/label counts over chunks of coded survey rows"""
+
+    def __init__(self, categories):
+        # categories: column -> ordered category list; codes index into it
+        self.categories = {column: list(values) for column, values in categories.items()}
+        self.columns = list(self.categories)
+        self.shape = tuple(len(values) for values in self.categories.values())
+        self.counts = np.zeros(int(np.prod(self.shape)), dtype=np.int64)
+        self.invalid_rows = 0
+
+    def add_codes(self, codes):
+        """Add a chunk given as column -> integer code array (-1 marks a missing value)"""
+        index = np.zeros(len(codes[self.columns[0]]), dtype=np.int64)
+        valid = np.ones(len(index), dtype=bool)
+        for column, size in zip(self.columns, self.shape):
+            column_codes = np.asarray(codes[column], dtype=np.int64)
+            valid &= (column_codes >= 0) & (column_codes < size)
+            # Row-major mixed-radix position of the row's combination
+            index = index * size + column_codes
+        self.invalid_rows += int((~valid).sum())
+        self.counts += np.bincount(index[valid], minlength=len(self.counts))
+
+    def add_frame(self, df):
+        """Add a chunk of a DataFrame whose columns are categorical (or plain strings)"""
+        import pandas as pd
+
+        codes = {}
+        for column in self.columns:
+            series = df[column]
+            if isinstance(series.dtype, pd.CategoricalDtype) and list(series.cat.categories) == self.categories[column]:
+                codes[column] = series.cat.codes.to_numpy()
+            else:
+                # Values outside the categories get code -1
+                codes[column] = pd.Categorical(series, categories=self.categories[column]).codes
+        self.add_codes(codes)
+
+    def report(self):
+        """Marginals, pairwise crosstabs and label distribution per answer combination"""
+        joint = self.counts.reshape(self.shape)
+        rows = int(joint.sum())
+        axes = range(len(self.columns))
+
+        marginals = {}
+        for axis, column in enumerate(self.columns):
+            totals = joint.sum(axis=tuple(a for a in axes if a != axis))
+            marginals[column] = {
+                value: {'count': int(count), 'share': float(count / rows) if rows else 0.0}
+                for value, count in zip(self.categories[column], totals)
+            }
+
+        crosstabs = {}
+        for first, second in itertools.combinations(axes, 2):
+            table = joint.sum(axis=tuple(a for a in axes if a not in (first, second)))
+            crosstabs[f"{self.columns[first]}|{self.columns[second]}"] = {
+                row_value: {
+                    column_value: int(table[i, j])
+                    for j, column_value in enumerate(self.categories[self.columns[second]])
+                }
+                for i, row_value in enumerate(self.categories[self.columns[first]])
+            }
+
+        # The last column is the label; every other column is an answer
+        label_column = self.columns[-1]
+        answer_columns = self.columns[:-1]
+        by_answers = joint.reshape(-1, self.shape[-1])
+        combinations = []
+        for position, answers in enumerate(itertools.product(*(self.categories[c] for c in answer_columns))):
+            total = int(by_answers[position].sum())
+            if not total:
+                continue
+            combinations.append({
+                'answers': dict(zip(answer_columns, answers)),
+                'rows': total,
+                'labels': {
+                    label: float(count / total)
+                    for label, count in zip(self.categories[label_column], by_answers[position])
+                }
+            })
+
+        return {
+            'rows': rows,
+            'invalid_rows': self.invalid_rows,
+            'label_column': label_column,
+            'marginals': marginals,
+            'crosstabs': crosstabs,
+            'label_by_combination': combinations
+        }
+
+def crosstab_share(report, given, given_value, other, other_value):
+    """Share of rows with other == other_value among rows with given == given_value"""
+    key = f"{given}|{other}"
+    if key in report['crosstabs']:
+        row = report['crosstabs'][key][given_value]
+        count = row[other_value]
+    else:
+        row = {value: counts[given_value] for value, counts in report['crosstabs'][f"{other}|{given}"].items()}
+        count = row[other_value]
+    total = sum(row.values())
+    return count / total if total else None
+
+def profile_frame(df, categories):
+    """Profile an in-memory DataFrame in one pass"""
+    profiler = SurveyProfiler(categories)
+    profiler.add_frame(df)
+    return profiler.report()
+
+def profile_csv(path, categories, chunk_size=1_000_000):
+    """Profile a survey CSV chunk by chunk, in memory bounded by chunk_size"""
+    import pandas as pd
+
+    dtypes = {column: pd.CategoricalDtype(values) for column, values in categories.items()}
+    profiler = SurveyProfiler(categories)
+    for chunk in pd.read_csv(path, usecols=list(categories), dtype=dtypes, chunksize=chunk_size):
+        profiler.add_frame(chunk)
+    return profiler.report()
+
+def format_profile(report, columns=None):
+    """Human-readable summary of a profile report (marginals, most common first)"""
+    lines = [f"{report['rows']} rows profiled" + (
+        f", {report['invalid_rows']} with unknown values skipped" if report['invalid_rows'] else "")]
+    for column in columns or report['marginals']:
+        lines.append(f"\n{column}:")
+        ranked = sorted(report['marginals'][column].items(), key=lambda item: -item[1]['count'])
+        for value, stats in ranked:
+            lines.append(f"  {value}: {stats['count']} ({stats['share'] * 100:.1f}%)")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile a survey dataset CSV in one pass")
+    parser.add_argument('path')
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--json', action='store_true', help="print the full report as JSON")
+    args = parser.parse_args()
+
+    from survey_risk_schema import CATEGORIES
+    report = profile_csv(args.path, CATEGORIES, args.chunk_size)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_profile(report))
+
+if __name__ == "__main__":
+    main()
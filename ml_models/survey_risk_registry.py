@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Versioned model registry with lazy per-model loading
+Usage: python survey_risk_registry.py --list
+       python survey_risk_registry.py --show [VERSION]
+       python survey_risk_registry.py --activate VERSION
+       python survey_risk_registry.py --publish   (from survey_risk_model.pkl)
+
+Every artifact lives under MODEL_DIR (SURVEY_RISK_MODEL_DIR, by default the
+ml_models directory), so predictions do not depend on the caller's working
+directory. Published models go to <MODEL_DIR>/registry/:
+
+    CURRENT                 the active version number
+    v<N>/manifest.json      metadata, encoders, cascade and one entry per model
+    v<N>/<model>.pkl        each fitted estimator on its own
+    v<N>/<model>.bin        its NumPy array export, when it has one
+    v<N>/table.json         the answer table compiled from this version
+    v<N>/holdout.pkl        the held-out feature rows the models were scored on
+    v<N>/incremental.pkl    the --update state (replay buffer, held-out set)
+
+A version directory is written under a temporary name and renamed into
+place, then CURRENT is replaced atomically, so readers see either the old
+version or the complete new one; --activate rolls back the same way.
+Loading a version reads only its manifest. Each model is loaded on first
+use, from its memory-mapped arrays when it has them (no sklearn import) and
+by unpickling otherwise, so a request that needs one model loads one model.
+
+The predictor imports this module on its cold-start path, so only light
+standard library modules are imported up front.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+
+MODEL_DIR = os.path.abspath(os.environ.get('SURVEY_RISK_MODEL_DIR', os.path.dirname(os.path.abspath(__file__))))
+REGISTRY_DIR = os.path.join(MODEL_DIR, 'registry')
+CURRENT_NAME = 'CURRENT'
+REGISTRY_FORMAT_VERSION = 1
+# Newest versions kept on publish; the active one is never removed
+KEEP_VERSIONS = 10
+
+def current_path(registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, CURRENT_NAME)
+
+def version_dir(version, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, f"v{version}")
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    """Published version numbers, oldest first"""
+    if not os.path.isdir(registry_dir):
+        return []
+    versions = []
+    for name in os.listdir(registry_dir):
+        path = os.path.join(registry_dir, name, 'manifest.json')
+        if name.startswith('v') and name[1:].isdigit() and os.path.exists(path):
+            versions.append(int(name[1:]))
+    return sorted(versions)
+
+def current_version(registry_dir=REGISTRY_DIR):
+    """The active version, or None if nothing has been published"""
+    try:
+        with open(current_path(registry_dir)) as f:
+            return int(f.read().strip())
+    except FileNotFoundError:
+        return None
+
+def next_version(registry_dir=REGISTRY_DIR):
+    return max(list_versions(registry_dir), default=0) + 1
+
+def read_manifest(version, registry_dir=REGISTRY_DIR):
+    with open(os.path.join(version_dir(version, registry_dir), 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != REGISTRY_FORMAT_VERSION:
+        raise ValueError(f"Unsupported registry format: {manifest.get('format_version')}")
+    return manifest
+
+def activate(version, registry_dir=REGISTRY_DIR):
+    """Point CURRENT at a published version"""
+    if version not in list_versions(registry_dir):
+        raise ValueError(f"Version {version} is not in {registry_dir}")
+    temp_path = f"{current_path(registry_dir)}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(f"{version}\n")
+    os.replace(temp_path, current_path(registry_dir))
+
+def publish_model(model_data, answer_table=None, registry_dir=REGISTRY_DIR, keep=KEEP_VERSIONS):
+    """Store every estimator of model_data as a new version and make it current
+
+    The version is model_data['model_version'] when the caller set one (so
+    the pickle and table it saved first can carry it), the next free number
+    otherwise. Returns the version's manifest.
+    """
+    import pickle
+    import shutil
+    from survey_risk_arrays import export_estimator_arrays
+
+    version = model_data.get('model_version') or next_version(registry_dir)
+    model_data['model_version'] = version
+    os.makedirs(registry_dir, exist_ok=True)
+    target = version_dir(version, registry_dir)
+    if os.path.exists(target):
+        raise FileExistsError(f"Version {version} is already published in {registry_dir}")
+
+    temp_dir = os.path.join(registry_dir, f".tmp-v{version}-{os.getpid()}")
+    os.makedirs(temp_dir)
+    try:
+        models = {}
+        for name, model in model_data['all_models'].items():
+            entry = {'pickle': f"{name}.pkl"}
+            with open(os.path.join(temp_dir, entry['pickle']), 'wb') as f:
+                pickle.dump(model, f)
+            try:
+                spec, data = export_estimator_arrays(model)
+            except (KeyError, ValueError) as e:
+                # Served by unpickling instead
+                print(f"⚠️  {name} has no array export ({e})", file=sys.stderr)
+            else:
+                entry['arrays'] = dict(spec, data_file=f"{name}.bin")
+                with open(os.path.join(temp_dir, entry['arrays']['data_file']), 'wb') as f:
+                    f.write(data)
+            models[name] = entry
+
+        manifest = {
+            'format_version': REGISTRY_FORMAT_VERSION,
+            'version': version,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'best_model_name': model_data['best_model_name'],
+            'best_accuracy': float(model_data['best_accuracy']),
+            'feature_columns': list(model_data['feature_columns']),
+            'encoders': {
+                column: [str(c) for c in encoder.classes_]
+                for column, encoder in model_data['encoders'].items()
+            },
+            'results': {name: float(accuracy) for name, accuracy in model_data['results'].items()},
+            'cascade': model_data.get('cascade'),
+            'labeled_rows': model_data.get('labeled_rows', 0),
+            'training': model_data.get('training'),
+            'models': models
+        }
+        if 'holdout_X' in model_data:
+            # The rows the models were evaluated on, for relearning the cascade
+            manifest['holdout'] = 'holdout.pkl'
+            with open(os.path.join(temp_dir, manifest['holdout']), 'wb') as f:
+                pickle.dump(model_data['holdout_X'], f)
+        if 'incremental' in model_data:
+            # So an update can continue from any version, e.g. after a rollback
+            manifest['incremental'] = 'incremental.pkl'
+            with open(os.path.join(temp_dir, manifest['incremental']), 'wb') as f:
+                pickle.dump(model_data['incremental'], f)
+        if answer_table is not None:
+            manifest['table'] = 'table.json'
+            with open(os.path.join(temp_dir, manifest['table']), 'w') as f:
+                json.dump(answer_table, f)
+        with open(os.path.join(temp_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(temp_dir, target)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    activate(version, registry_dir)
+    prune(keep, registry_dir)
+    return manifest
+
+def prune(keep=KEEP_VERSIONS, registry_dir=REGISTRY_DIR):
+    """Remove all but the newest `keep` versions, never the active one"""
+    import shutil
+
+    active = current_version(registry_dir)
+    versions = list_versions(registry_dir)
+    removed = []
+    for version in versions[:max(0, len(versions) - keep)]:
+        if version != active:
+            shutil.rmtree(version_dir(version, registry_dir), ignore_errors=True)
+            removed.append(version)
+    return removed
+
+class LazyModels:
+    """Read-only name -> model mapping that loads each model on first access
+
+    Iterating names (and len / in) never loads anything; indexing, values()
+    and items() load what they touch. Names keep the manifest's order, which
+    is the all_models order the predictors break ties by.
+    """
+
+    def __init__(self, path, manifest, prefer_arrays=True):
+        self.path = path
+        self.specs = manifest['models']
+        self.prefer_arrays = prefer_arrays
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        model = self._models.get(name)
+        if model is None:
+            spec = self.specs[name]
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._load(spec)
+                    self._models[name] = model
+        return model
+
+    def _load(self, spec):
+        if self.prefer_arrays and 'arrays' in spec:
+            from survey_risk_arrays import load_estimator_arrays, map_data_file
+            return load_estimator_arrays(spec['arrays'], map_data_file(os.path.join(self.path, spec['arrays']['data_file'])))
+        import pickle
+        with open(os.path.join(self.path, spec['pickle']), 'rb') as f:
+            return pickle.load(f)
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def keys(self):
+        return self.specs.keys()
+
+    def values(self):
+        return [self[name] for name in self.specs]
+
+    def items(self):
+        return [(name, self[name]) for name in self.specs]
+
+    def get(self, name, default=None):
+        return self[name] if name in self.specs else default
+
+    def loaded(self):
+        """Names of the models loaded so far"""
+        return [name for name in self.specs if name in self._models]
+
+def load_version(version=None, registry_dir=REGISTRY_DIR, prefer_arrays=True):
+    """model_data for a version (default: the current one) with lazily loaded models"""
+    if version is None:
+        version = current_version(registry_dir)
+        if version is None:
+            raise FileNotFoundError(f"No model has been published to {registry_dir}")
+    from survey_risk_arrays import EncoderArrays
+
+    manifest = read_manifest(version, registry_dir)
+    path = version_dir(version, registry_dir)
+    return {
+        'best_model_name': manifest['best_model_name'],
+        'best_accuracy': manifest['best_accuracy'],
+        'all_models': LazyModels(path, manifest, prefer_arrays),
+        'encoders': {column: EncoderArrays(classes) for column, classes in manifest['encoders'].items()},
+        'feature_columns': manifest['feature_columns'],
+        'results': manifest['results'],
+        'cascade': manifest.get('cascade'),
+        'model_version': version
+    }
+
+def load_full_version(version=None, registry_dir=REGISTRY_DIR):
+    """model_data for retraining a version: every estimator unpickled, plus its held-out rows and update state
+
+    Commands that change models (cascade learning, --update) start from
+    the active version this way, so they follow a rollback.
+    """
+    import pickle
+
+    model_data = load_version(version, registry_dir, prefer_arrays=False)
+    manifest = read_manifest(model_data['model_version'], registry_dir)
+    model_data['all_models'] = dict(model_data['all_models'].items())
+    model_data['best_model'] = model_data['all_models'][model_data['best_model_name']]
+    model_data['labeled_rows'] = manifest.get('labeled_rows', 0)
+    if manifest.get('training'):
+        model_data['training'] = manifest['training']
+    path = version_dir(model_data['model_version'], registry_dir)
+    for key, name in (('holdout_X', manifest.get('holdout')), ('incremental', manifest.get('incremental'))):
+        if name:
+            with open(os.path.join(path, name), 'rb') as f:
+                model_data[key] = pickle.load(f)
+    return model_data
+
+def save_table(answer_table, version=None, registry_dir=REGISTRY_DIR):
+    """Replace a version's answer table (default: the current one's); returns its path"""
+    if version is None:
+        version = current_version(registry_dir)
+    path = os.path.join(version_dir(version, registry_dir), 'table.json')
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(answer_table, f)
+    os.replace(temp_path, path)
+
+    manifest = read_manifest(version, registry_dir)
+    if manifest.get('table') != 'table.json':
+        manifest['table'] = 'table.json'
+        manifest_path = os.path.join(version_dir(version, registry_dir), 'manifest.json')
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, manifest_path)
+    return path
+
+def table_path(version=None, registry_dir=REGISTRY_DIR):
+    """Answer table of a version (default: the current one), or None if it has none"""
+    if version is None:
+        version = current_version(registry_dir)
+        if version is None:
+            return None
+    path = os.path.join(version_dir(version, registry_dir), 'table.json')
+    return path if os.path.exists(path) else None
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect and manage published survey risk models")
+    parser.add_argument('--registry-dir', default=REGISTRY_DIR)
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--list', action='store_true', help="list published versions")
+    action.add_argument('--show', type=int, nargs='?', const=0, metavar='VERSION',
+                        help="print a version's manifest (default: the current one)")
+    action.add_argument('--activate', type=int, metavar='VERSION', help="make a published version current")
+    action.add_argument('--publish', action='store_true',
+                        help="publish survey_risk_model.pkl and its answer table as a new version")
+    args = parser.parse_args()
+
+    if args.list:
+        active = current_version(args.registry_dir)
+        for version in list_versions(args.registry_dir):
+            manifest = read_manifest(version, args.registry_dir)
+            print(f"{'*' if version == active else ' '} v{version}  {manifest['created']}  "
+                  f"{manifest['best_model_name']} {manifest['best_accuracy']:.3f}  {', '.join(manifest['models'])}")
+        return
+
+    if args.show is not None:
+        version = args.show or current_version(args.registry_dir)
+        if version is None:
+            print(f"No model has been published to {args.registry_dir}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(read_manifest(version, args.registry_dir), indent=2))
+        return
+
+    if args.activate is not None:
+        activate(args.activate, args.registry_dir)
+        print(f"✅ Version {args.activate} is now current")
+        return
+
+    import pickle
+    import warnings
+    warnings.filterwarnings('ignore')
+    from predict_survey_risk import MODEL_PATH, compile_answer_table
+
+    with open(MODEL_PATH, 'rb') as f:
+        model_data = pickle.load(f)
+    model_data['model_version'] = next_version(args.registry_dir)
+    manifest = publish_model(model_data, compile_answer_table(model_data), args.registry_dir)
+    print(f"✅ Published {MODEL_PATH} as version {manifest['version']} in {args.registry_dir}")
+
+if __name__ == "__main__":
+    main()
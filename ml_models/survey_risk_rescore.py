@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Sharded, resumable bulk rescoring of stored survey answers
+Usage: python survey_risk_rescore.py users.jsonl (or users.csv) [--output rescored.csv] [--format csv|jsonl]
+                                     [--shard-rows N] [--workers N] [--cascade] [--keep-shards]
+
+The input is an export with one user per line: JSONL objects (mongoexport
+output works, {"$oid": ...} ids included) or CSV rows, each with a userId
+and the survey answers, either flat or under "survey". The input is split
+into shards of shard-rows lines by byte offset in one streaming pass, and
+the shards are scored in a process pool; each worker reads only its byte
+range and scores it BATCH_CHUNK_SIZE rows at a time with predict_risk_batch,
+so memory stays bounded whatever the size of the export.
+
+Every shard is written to <work dir>/shard-NNNNN.<format> and marked done
+with a small stats file once complete. The work dir is keyed by the input
+file, the model version and the job settings, so an interrupted job rerun
+with the same arguments only scores the shards that are not done yet. All
+shards score against the model version that was current when the job
+started, even if a new one is published mid-run.
+
+When every shard is done they are concatenated in input order into one file
+ready for bulk loading: CSV with a header row (userId, predicted_risk,
+confidence, one probability column per risk level, method, model_used,
+model_version), suitable for COPY / LOAD DATA / mongoimport, or JSONL with
+one object per line carrying the same fields. Rows without a userId or that do
+not parse are skipped and counted.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+import itertools
+import multiprocessing
+import warnings
+warnings.filterwarnings('ignore')
+
+import survey_risk_registry as registry
+from survey_risk_dataset_cache import cache_key
+from survey_risk_schema import RISK_LEVELS
+from predict_survey_risk import (
+    BATCH_CHUNK_SIZE, default_model_path, file_signature, fallback_prediction,
+    load_model_data, predict_risk_batch
+)
+
+RESCORE_WORK_DIR = os.environ.get('SURVEY_RISK_RESCORE_DIR', os.path.join(registry.MODEL_DIR, '.rescore_shards'))
+DEFAULT_SHARD_ROWS = 50000
+OUTPUT_FORMATS = ('csv', 'jsonl')
+OUTPUT_COLUMNS = (
+    ['userId', 'predicted_risk', 'confidence']
+    + [f'probability_{level}' for level in RISK_LEVELS]
+    + ['method', 'model_used', 'model_version']
+)
+
+def plan_shards(input_path, shard_rows=DEFAULT_SHARD_ROWS):
+    """Byte ranges of shard_rows lines each, plus the CSV header (None for JSONL)"""
+    header = None
+    shards = []
+    with open(input_path, 'rb') as f:
+        if input_path.endswith('.csv'):
+            header_line = f.readline()
+            header = next(csv.reader([header_line.decode('utf-8-sig')]))
+        start = offset = f.tell()
+        rows = 0
+        for line in f:
+            offset += len(line)
+            rows += 1
+            if rows == shard_rows:
+                shards.append((start, offset))
+                start, rows = offset, 0
+        if rows:
+            shards.append((start, offset))
+    return header, shards
+
+def shard_lines(f, start, end):
+    """Decoded lines of an open binary file between two byte offsets"""
+    f.seek(start)
+    offset = start
+    while offset < end:
+        line = f.readline()
+        if not line:
+            break
+        offset += len(line)
+        yield line.decode('utf-8')
+
+def read_shard(input_path, start, end, header=None):
+    """Yield the rows in a byte range as dicts, or None for lines that do not parse"""
+    with open(input_path, 'rb') as f:
+        lines = shard_lines(f, start, end)
+        if header is not None:
+            for values in csv.reader(lines):
+                if values:
+                    yield dict(zip(header, values)) if len(values) == len(header) else None
+            return
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else None
+
+def user_id(row):
+    """A row's userId as a string; mongoexport writes ObjectIds as {"$oid": ...}"""
+    value = row.get('userId')
+    if isinstance(value, dict):
+        value = value.get('$oid')
+    return str(value) if value not in (None, '') else None
+
+def output_row(uid, result):
+    """A scored user's values in OUTPUT_COLUMNS order"""
+    probabilities = result['probabilities']
+    return (
+        [uid, str(result['predicted_risk']), float(result['confidence'])]
+        + [float(probabilities.get(level, 0.0)) for level in RISK_LEVELS]
+        + [result['method'], result['model_used'], result.get('model_version')]
+    )
+
+def shard_path(work_dir, index, output_format):
+    return os.path.join(work_dir, f"shard-{index:05d}.{output_format}")
+
+def done_path(work_dir, index):
+    return os.path.join(work_dir, f"shard-{index:05d}.done.json")
+
+def load_shard_stats(work_dir, index):
+    """A finished shard's stats, or None if it has to (re)run"""
+    try:
+        with open(done_path(work_dir, index)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Loaded by the parent before the pool starts, so forked workers share it
+# copy-on-write; workers that were not forked load it once themselves
+_worker_model_data = None
+
+def _init_worker(model_source):
+    global _worker_model_data
+    if _worker_model_data is None:
+        _worker_model_data = load_job_model(model_source)
+
+def load_job_model(model_source):
+    """model_data for the job's pinned model, or None to use the rule-based fallback"""
+    kind, value = model_source
+    if kind == 'registry':
+        return registry.load_version(value)
+    if kind == 'file':
+        return load_model_data(value)
+    return None
+
+def score_shard(job):
+    """Score one shard into its output file and mark it done; returns its stats"""
+    index, start, end = job['index'], job['start'], job['end']
+    work_dir, output_format = job['work_dir'], job['format']
+    started = time.perf_counter()
+    stats = {'index': index, 'rows': 0, 'skipped': 0, 'predicted': {}}
+
+    path = shard_path(work_dir, index, output_format)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    rows = read_shard(job['input_path'], start, end, job['header'])
+    with open(temp_path, 'w', newline='') as f:
+        writer = csv.writer(f) if output_format == 'csv' else None
+        predicted = stats['predicted']
+        while True:
+            chunk = list(itertools.islice(rows, job['chunk_size']))
+            if not chunk:
+                break
+            users, surveys = [], []
+            for row in chunk:
+                uid = user_id(row) if row is not None else None
+                if uid is None:
+                    stats['skipped'] += 1
+                    continue
+                users.append(uid)
+                surveys.append(row['survey'] if isinstance(row.get('survey'), dict) else row)
+
+            if _worker_model_data is None:
+                results = [fallback_prediction(survey) for survey in surveys]
+            else:
+                results = predict_risk_batch(surveys, _worker_model_data, cascade=job['cascade'])
+            output_rows = [output_row(uid, result) for uid, result in zip(users, results)]
+            if writer is not None:
+                writer.writerows(output_rows)
+            else:
+                f.writelines(json.dumps(dict(zip(OUTPUT_COLUMNS, values))) + '\n' for values in output_rows)
+            for values in output_rows:
+                predicted[values[1]] = predicted.get(values[1], 0) + 1
+            stats['rows'] += len(users)
+    os.replace(temp_path, path)
+
+    stats['seconds'] = time.perf_counter() - started
+    # Written last: a shard without it is rerun from scratch
+    temp_path = f"{done_path(work_dir, index)}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(stats, f)
+    os.replace(temp_path, done_path(work_dir, index))
+    return stats
+
+def resolve_model_source():
+    """Pin the model to score with: ('registry', version), ('file', path) or ('rules', None)"""
+    version = registry.current_version()
+    if version is not None:
+        return ('registry', version)
+    path = default_model_path()
+    return ('file', path) if os.path.exists(path) else ('rules', None)
+
+def merge_shards(work_dir, n_shards, output_path, output_format):
+    """Concatenate the shard files in input order into the final output"""
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', newline='') as out:
+        if output_format == 'csv':
+            csv.writer(out).writerow(OUTPUT_COLUMNS)
+        for index in range(n_shards):
+            with open(shard_path(work_dir, index, output_format), newline='') as f:
+                shutil.copyfileobj(f, out)
+    os.replace(temp_path, output_path)
+
+def rescore(input_path, output_path, output_format='csv', shard_rows=DEFAULT_SHARD_ROWS,
+            n_workers=None, cascade=False, chunk_size=BATCH_CHUNK_SIZE,
+            work_root=RESCORE_WORK_DIR, keep_shards=False):
+    """Score every user in an export, resuming any shards already done; returns the totals"""
+    started = time.perf_counter()
+    model_source = resolve_model_source()
+    if model_source[0] == 'rules':
+        print("⚠️  No trained model found, rescoring with the rule-based fallback", file=sys.stderr)
+
+    # A different input, model or setting gets a fresh work dir instead of
+    # mixing with another job's shards
+    job_key = cache_key({
+        'input': os.path.abspath(input_path),
+        'input_signature': list(file_signature(input_path)),
+        'model': list(model_source),
+        'model_signature': list(file_signature(model_source[1])) if model_source[0] == 'file' else None,
+        'shard_rows': shard_rows,
+        'format': output_format,
+        'cascade': cascade
+    })
+    work_dir = os.path.join(work_root, job_key[:16])
+    os.makedirs(work_dir, exist_ok=True)
+
+    header, shards = plan_shards(input_path, shard_rows)
+    all_stats = [load_shard_stats(work_dir, index) for index in range(len(shards))]
+    jobs = [
+        {'index': index, 'start': start, 'end': end, 'input_path': input_path, 'header': header,
+         'work_dir': work_dir, 'format': output_format, 'chunk_size': chunk_size, 'cascade': cascade}
+        for index, (start, end) in enumerate(shards) if all_stats[index] is None
+    ]
+    resumed_rows = sum(stats['rows'] for stats in all_stats if stats is not None)
+    print(f"Rescoring {input_path} with model {describe_model(model_source)}: {len(shards)} shards "
+          f"({len(shards) - len(jobs)} already done, {len(jobs)} to run)")
+
+    if jobs:
+        # Loading every model up front also fails fast on a broken artifact,
+        # instead of in each worker
+        global _worker_model_data
+        _worker_model_data = load_job_model(model_source)
+        if _worker_model_data is not None:
+            for _ in _worker_model_data['all_models'].values():
+                pass
+        n_workers = max(1, min(n_workers or os.cpu_count() or 1, len(jobs)))
+        scoring_started = time.perf_counter()
+        scored_rows = 0
+        with multiprocessing.get_context().Pool(n_workers, _init_worker, (model_source,)) as pool:
+            for done, stats in enumerate(pool.imap_unordered(score_shard, jobs), 1):
+                all_stats[stats['index']] = stats
+                scored_rows += stats['rows'] + stats['skipped']
+                elapsed = time.perf_counter() - scoring_started
+                rate = scored_rows / elapsed if elapsed > 0 else 0.0
+                remaining = (len(jobs) - done) * elapsed / done
+                print(f"  [{done}/{len(jobs)}] shard {stats['index']}: {stats['rows']} rows "
+                      f"in {stats['seconds']:.1f}s; {rate:,.0f} rows/s, ~{remaining:.0f}s left")
+
+    merge_shards(work_dir, len(shards), output_path, output_format)
+    if not keep_shards:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    totals = {
+        'rows': sum(stats['rows'] for stats in all_stats),
+        'skipped': sum(stats['skipped'] for stats in all_stats),
+        'resumed_rows': resumed_rows,
+        'seconds': time.perf_counter() - started,
+        'model_version': model_source[1] if model_source[0] == 'registry' else None,
+        'predicted': {}
+    }
+    for stats in all_stats:
+        for level, count in stats['predicted'].items():
+            totals['predicted'][level] = totals['predicted'].get(level, 0) + count
+    return totals
+
+def describe_model(model_source):
+    kind, value = model_source
+    if kind == 'registry':
+        return f"v{value}"
+    return os.path.basename(value) if kind == 'file' else "rule-based fallback"
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore every stored user's survey answers in parallel shards")
+    parser.add_argument('input', help="JSONL or CSV export with userId and survey answers")
+    parser.add_argument('--output', help="output path (default: <input>.rescored.<format>)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='csv')
+    parser.add_argument('--shard-rows', type=int, default=DEFAULT_SHARD_ROWS, help="input lines per shard")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--cascade', action='store_true', help="score with the confidence cascade")
+    parser.add_argument('--work-dir', default=RESCORE_WORK_DIR, help="where shard checkpoints are kept")
+    parser.add_argument('--keep-shards', action='store_true', help="keep the shard files after merging")
+    args = parser.parse_args()
+    if args.shard_rows < 1:
+        parser.error("--shard-rows must be positive")
+
+    output_path = args.output or f"{os.path.splitext(args.input)[0]}.rescored.{args.format}"
+    totals = rescore(args.input, output_path, args.format, args.shard_rows, args.workers,
+                     args.cascade, work_root=args.work_dir, keep_shards=args.keep_shards)
+
+    rate = (totals['rows'] - totals['resumed_rows']) / totals['seconds'] if totals['seconds'] > 0 else 0.0
+    print(f"✅ {totals['rows']} users rescored ({totals['resumed_rows']} from earlier runs, "
+          f"{totals['skipped']} rows skipped) in {totals['seconds']:.1f}s, {rate:,.0f} rows/s; "
+          f"saved to {output_path}")
+    print("📊 Predicted risk levels: " + ', '.join(
+        f"{level} {totals['predicted'].get(level, 0)}" for level in RISK_LEVELS
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Survey schema shared by the generator, trainer and predictors
+
+Every question's categories are defined once here, each with a fixed integer
+code: its position in sorted order. That is the order LabelEncoder produced
+before the schema existed, so models trained earlier read the same codes,
+and the codes stay stable across retrains. Codes fit in int8 and -1 marks an
+answer outside the schema, so datasets travel as compact int8 arrays
+instead of Python strings.
+
+QUESTIONS lists the options in the order the frontend shows them, which is
+also the order of the generator's profile distributions; option_codes maps
+that order to schema codes.
+
+Only the standard library is imported here so the predictor's cold start
+stays light; the numpy, pandas and sklearn helpers import on first use.
+"""
+
+# Survey options (matching frontend exactly)
+QUESTIONS = {
+    'risk': ['Low', 'Medium', 'High'],
+    'goal': ['Wealth Growth', 'Retirement', 'Short-Term Gains', 'Passive Income'],
+    'investmentDuration': ['Short-term (1-3 years)', 'Medium-term (3-7 years)', 'Long-term (7+ years)'],
+    'experience': ['Beginner', 'Intermediate', 'Advanced']
+}
+LABEL_COLUMN = 'risk_level'
+RISK_LEVELS = ['Low', 'Moderate', 'High']
+FEATURE_COLUMNS = list(QUESTIONS)
+
+UNKNOWN_CODE = -1
+CODE_DTYPE = 'int8'
+
+# Category lists in code order, and category -> code lookups, for every
+# dataset column (answers, then the label)
+CATEGORIES = {
+    column: sorted(options)
+    for column, options in dict(QUESTIONS, **{LABEL_COLUMN: RISK_LEVELS}).items()
+}
+CODES = {
+    column: {value: code for code, value in enumerate(values)}
+    for column, values in CATEGORIES.items()
+}
+
+def option_codes(column):
+    """Schema code of each option of a column, in frontend order"""
+    options = RISK_LEVELS if column == LABEL_COLUMN else QUESTIONS[column]
+    return [CODES[column][option] for option in options]
+
+def encode_answers(survey_data, columns=FEATURE_COLUMNS, unknown=UNKNOWN_CODE):
+    """Codes of one survey's answers; missing or unknown answers get `unknown`"""
+    codes = []
+    for column in columns:
+        value = survey_data.get(column)
+        codes.append(CODES[column].get(value, unknown) if isinstance(value, str) else unknown)
+    return codes
+
+def schema_dtypes(columns=None):
+    """Fixed pandas categorical dtypes; a column's .cat.codes are its schema codes"""
+    import pandas as pd
+
+    return {
+        column: pd.CategoricalDtype(CATEGORIES[column])
+        for column in (columns or CATEGORIES)
+    }
+
+def encode_frame(df, columns=FEATURE_COLUMNS):
+    """int8 code matrix for DataFrame columns, without fitting any encoder"""
+    import numpy as np
+    import pandas as pd
+
+    encoded = np.empty((len(df), len(columns)), dtype=CODE_DTYPE)
+    for j, column in enumerate(columns):
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) and list(series.cat.categories) == CATEGORIES[column]:
+            encoded[:, j] = series.cat.codes.to_numpy()
+        else:
+            # Values outside the schema come back as -1
+            encoded[:, j] = pd.Categorical(series, categories=CATEGORIES[column]).codes
+    return encoded
+
+def schema_encoders(columns=FEATURE_COLUMNS):
+    """LabelEncoders fixed to the schema categories, as saved models carry them"""
+    import numpy as np
+    from sklearn.preprocessing import LabelEncoder
+
+    encoders = {}
+    for column in columns:
+        encoders[column] = LabelEncoder()
+        encoders[column].classes_ = np.array(CATEGORIES[column], dtype=object)
+    return encoders
+
+def matches_schema(encoders):
+    """Whether saved encoders use exactly the schema codes"""
+    return all(
+        [str(value) for value in encoder.classes_] == CATEGORIES.get(column)
+        for column, encoder in encoders.items()
+    )
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Budgeted hyperparameter search for the survey risk candidate models
+Used by survey_risk_model.py --search-budget SECONDS.
+
+Successive halving per model family: a random sample of configurations is
+scored by stratified k-fold cross-validation (folds run in parallel) on a
+small resource, the best 1/ETA move up a rung, and the resource grows ETA
+times. Forests spend the resource on n_estimators, the other families on
+training rows. Each family gets an equal share of the wall-clock budget, and
+a family that finishes early or runs out hands what it did not spend to the
+families still climbing. Within a rung the families take turns, one
+evaluation each, so no family is always scored first. An evaluation is only
+started when its estimated cost fits the family's share, and each family's
+winner is the best configuration on the highest rung it reached. Every
+evaluation is recorded in the trace.
+"""
+
+import os
+import json
+import math
+import time
+import itertools
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
+
+from survey_risk_registry import MODEL_DIR
+
+ETA = 3
+DEFAULT_CV_FOLDS = 5
+SEARCH_TRACE_PATH = os.path.join(MODEL_DIR, 'survey_risk_search.json')
+
+# Grids per family. 'resource' is what successive halving grows; 'overrides'
+# apply only while searching (SVC probability calibration does not change
+# accuracy and would cost an internal 5-fold fit)
+SEARCH_SPACES = {
+    'RandomForest': {
+        'resource': 'n_estimators',
+        'max_resource': 200,
+        'grid': {
+            'max_depth': [None, 4, 8, 16],
+            'min_samples_leaf': [1, 2, 5, 10],
+            'max_features': ['sqrt', None]
+        }
+    },
+    'LogisticRegression': {
+        'resource': 'n_samples',
+        'grid': {
+            'C': [0.01, 0.1, 1.0, 10.0, 100.0]
+        }
+    },
+    'SVC': {
+        'resource': 'n_samples',
+        'grid': {
+            'C': [0.1, 1.0, 10.0, 100.0],
+            'gamma': ['scale', 0.01, 0.1, 1.0]
+        },
+        'overrides': {'probability': False}
+    }
+}
+
+def grid_configurations(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def rung_resources(max_resource, min_resource, eta=ETA):
+    """Resources per rung, growing eta times and ending at max_resource"""
+    n_rungs = max(1, int(math.floor(math.log(max_resource / min_resource, eta))) + 1)
+    return [max(min_resource, int(round(max_resource / eta ** (n_rungs - 1 - rung)))) for rung in range(n_rungs)]
+
+def subsample(X, y, n_rows):
+    """Stratified, deterministic subset of the training rows"""
+    if n_rows >= len(X):
+        return X, y
+    X_part, _, y_part, _ = train_test_split(X, y, train_size=n_rows, stratify=y, random_state=42)
+    return X_part, y_part
+
+def search_hyperparameters(candidates, X, y, budget_seconds, cv=DEFAULT_CV_FOLDS, n_jobs=None, eta=ETA, seed=42):
+    """Successive halving over every family in `candidates` within budget_seconds
+
+    `candidates` maps a family name to (estimator class, default params), as
+    CANDIDATE_MODELS in survey_risk_model.py does. Returns a dict with the
+    winning params and CV score per family and the full evaluation trace.
+    """
+    started = time.perf_counter()
+    deadline = started + budget_seconds
+    n_jobs = n_jobs or min(cv, os.cpu_count() or 1)
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=seed)
+    rng = np.random.default_rng(seed)
+    # Each class needs a few rows in every fold
+    min_rows = min(len(X), cv * len(np.unique(y)) * 4)
+
+    plans = {}
+    for family, space in SEARCH_SPACES.items():
+        if family not in candidates:
+            continue
+        if space['resource'] == 'n_estimators':
+            resources = rung_resources(space['max_resource'], 10, eta)
+        else:
+            resources = rung_resources(len(X), min_rows, eta)
+        configurations = grid_configurations(space['grid'])
+        # Enough starters for one survivor on the top rung, capped by the grid
+        n_start = min(len(configurations), eta ** (len(resources) - 1) * 2)
+        order = rng.permutation(len(configurations))[:n_start]
+        plans[family] = {
+            'resources': resources,
+            'alive': [configurations[i] for i in order],
+            'best': None,
+            'last_seconds': None,
+            'budget_seconds': 0.0,
+            'spent_seconds': 0.0,
+            'out_of_budget': False,
+            'finished': False
+        }
+    for plan in plans.values():
+        plan['budget_seconds'] = budget_seconds / len(plans)
+
+    trace = []
+    n_rungs = max((len(plan['resources']) for plan in plans.values()), default=0)
+    for rung in range(n_rungs):
+        climbing = {
+            family: plan for family, plan in plans.items()
+            if rung < len(plan['resources']) and not plan['out_of_budget']
+        }
+        rungs = {}
+        for family, plan in climbing.items():
+            space = SEARCH_SPACES[family]
+            resource = plan['resources'][rung]
+            X_rung, y_rung = (X, y) if space['resource'] == 'n_estimators' else subsample(X, y, resource)
+            rungs[family] = {'resource': resource, 'X': X_rung, 'y': y_rung, 'scored': []}
+
+        # Families take turns, one configuration each, until every queue is empty
+        for turn in range(max((len(plan['alive']) for plan in climbing.values()), default=0)):
+            for family, plan in climbing.items():
+                if turn >= len(plan['alive']) or plan['out_of_budget']:
+                    continue
+                cls, defaults = candidates[family]
+                space = SEARCH_SPACES[family]
+                state = rungs[family]
+                params = plan['alive'][turn]
+                # Judge by the family's last evaluation; a new rung's resource is eta times larger
+                estimate = (plan['last_seconds'] or 0.0) * (eta if not state['scored'] else 1)
+                if (plan['spent_seconds'] + estimate > plan['budget_seconds']
+                        or time.perf_counter() + estimate > deadline):
+                    plan['out_of_budget'] = True
+                    continue
+                trial_params = dict(defaults, **params, **space.get('overrides', {}))
+                if space['resource'] == 'n_estimators':
+                    trial_params['n_estimators'] = state['resource']
+                evaluation_started = time.perf_counter()
+                scores = cross_val_score(cls(**trial_params), state['X'], state['y'], cv=folds, n_jobs=n_jobs)
+                seconds = time.perf_counter() - evaluation_started
+                plan['last_seconds'] = seconds
+                plan['spent_seconds'] += seconds
+                state['scored'].append((float(scores.mean()), params))
+                trace.append({
+                    'family': family,
+                    'rung': rung,
+                    'resource': space['resource'],
+                    'resource_value': state['resource'],
+                    'rows': len(state['X']),
+                    'params': params,
+                    'mean_score': float(scores.mean()),
+                    'std_score': float(scores.std()),
+                    'seconds': seconds
+                })
+
+        for family, state in rungs.items():
+            plan = plans[family]
+            scored = state['scored']
+            if scored:
+                # Stable sort keeps the sampled order on ties, so reruns agree
+                scored.sort(key=lambda item: -item[0])
+                best_score, best_params = scored[0]
+                plan['best'] = {'rung': rung, 'resource_value': state['resource'], 'score': best_score, 'params': best_params}
+                plan['alive'] = [params for _, params in scored[:max(1, len(scored) // eta)]]
+
+        # Families with nothing left to climb pass their unspent share on
+        for plan in plans.values():
+            if not plan['finished'] and (plan['out_of_budget'] or rung + 1 >= len(plan['resources'])):
+                plan['finished'] = True
+                heirs = [other for other in plans.values()
+                         if not other['out_of_budget'] and rung + 1 < len(other['resources'])]
+                unspent = max(0.0, plan['budget_seconds'] - plan['spent_seconds'])
+                for heir in heirs:
+                    heir['budget_seconds'] += unspent / len(heirs)
+
+    best_params = {}
+    cv_scores = {}
+    for family, plan in plans.items():
+        if plan['best'] is None:
+            continue
+        params = dict(plan['best']['params'])
+        if SEARCH_SPACES[family]['resource'] == 'n_estimators':
+            params['n_estimators'] = plan['best']['resource_value']
+        best_params[family] = params
+        cv_scores[family] = plan['best']['score']
+
+    return {
+        'budget_seconds': budget_seconds,
+        'elapsed_seconds': time.perf_counter() - started,
+        'out_of_budget': any(plan['out_of_budget'] for plan in plans.values()),
+        'family_seconds': {family: plan['spent_seconds'] for family, plan in plans.items()},
+        'cv_folds': cv,
+        'eta': eta,
+        'best_params': best_params,
+        'cv_scores': cv_scores,
+        'trace': trace
+    }
+
+def save_search_trace(search, trace_path=SEARCH_TRACE_PATH):
+    """Write the search result and trace atomically next to the model artifacts"""
+    temp_path = f"{trace_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(search, f, indent=2)
+    os.replace(temp_path, trace_path)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Asyncio prediction service with micro-batching over pre-forked workers
+Usage: python survey_risk_service.py --http 127.0.0.1:8765 | --unix /tmp/survey_risk.sock
+                                     [--workers N] [--max-batch-size 64] [--max-wait-ms 2] [--cascade]
+
+HTTP: POST /predict with a survey JSON body answers {"result": {...}};
+GET /stats reports request and batch counters. Unix socket: the --serve line
+protocol of predict_survey_risk.py ({"id", "survey"} in, {"id", "result"}
+out, in request order per connection).
+
+Surveys covered by the answer table are answered on the event loop. The rest
+are queued and coalesced into micro-batches of up to max-batch-size: a batch
+leaves as soon as a worker is free, and only when more requests are already
+waiting does it hold for up to max-wait-ms to fill up, so a lone request
+under light load is not delayed. Each batch goes to one of the worker
+processes, forked after the model is loaded so they share it copy-on-write,
+and is scored there with predict_risk_batch.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import itertools
+import multiprocessing
+import warnings
+warnings.filterwarnings('ignore')
+
+from predict_survey_risk import cached_answer_table, cached_model_data, lookup_answer_table, predict_risk_batch
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+
+def _worker_main(connection, cascade):
+    """Score batches sent by the service until the pipe closes"""
+    while True:
+        try:
+            batch_id, surveys = connection.recv()
+        except EOFError:
+            break
+        try:
+            # The model cache was filled before the fork, so this is the shared
+            # copy; without a model, predict_risk_batch serves the rule-based
+            # fallback and keeps trying the shared cache on later batches
+            results = predict_risk_batch(surveys, cascade=cascade)
+            connection.send((batch_id, results, None))
+        except Exception as e:
+            connection.send((batch_id, None, f"{type(e).__name__}: {e}"))
+
+class PredictionService:
+    """Micro-batching front end for a pool of prediction worker processes"""
+
+    def __init__(self, n_workers=None, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, cascade=False):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cascade = cascade
+        self.batch_ids = itertools.count()
+        self.in_flight = {}
+        self.stats = {'requests': 0, 'table_hits': 0, 'batches': 0, 'batched_requests': 0, 'worker_restarts': 0}
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.pending = asyncio.Queue()
+        self.idle_workers = asyncio.Queue()
+        # Load before forking so every worker shares the same model pages;
+        # registry models load lazily, so touch each one. Without a model the
+        # service still starts and answers from the table or the rule-based
+        # fallback, like predict_survey_risk.py
+        try:
+            for _ in cached_model_data()['all_models'].values():
+                pass
+        except FileNotFoundError:
+            print("Model file not found, serving rule-based fallback", file=sys.stderr)
+        except Exception as e:
+            print(f"ML model load error: {e}", file=sys.stderr)
+        self.context = multiprocessing.get_context('fork')
+        for _ in range(self.n_workers):
+            self.idle_workers.put_nowait(self._spawn_worker())
+        self.batcher = asyncio.create_task(self._batch_loop())
+
+    def _spawn_worker(self):
+        parent_end, child_end = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child_end, self.cascade), daemon=True)
+        process.start()
+        child_end.close()
+        # The fd is kept because fileno() fails once the connection is closed
+        worker = {'process': process, 'connection': parent_end, 'fd': parent_end.fileno(),
+                  'batch_id': None, 'dead': False}
+        self.loop.add_reader(worker['fd'], self._on_worker_message, worker)
+        return worker
+
+    def _on_worker_message(self, worker):
+        try:
+            batch_id, results, error = worker['connection'].recv()
+        except (EOFError, OSError):
+            self._replace_worker(worker)
+            return
+        futures = self.in_flight.pop(batch_id, [])
+        worker['batch_id'] = None
+        self.idle_workers.put_nowait(worker)
+        for index, future in enumerate(futures):
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(results[index])
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _replace_worker(self, worker):
+        """Fail the batch of a dead worker and start a fresh one in its place
+
+        Both a failed send and the EOF on the pipe end up here, so only the
+        first call does anything. A dead worker may still be queued in
+        idle_workers; _next_worker skips it.
+        """
+        if worker['dead']:
+            return
+        worker['dead'] = True
+        self.loop.remove_reader(worker['fd'])
+        worker['connection'].close()
+        for future in self.in_flight.pop(worker['batch_id'], []):
+            if not future.done():
+                future.set_exception(RuntimeError("Prediction worker exited"))
+        self.stats['worker_restarts'] += 1
+        print(f"Prediction worker {worker['process'].pid} exited, starting a new one", file=sys.stderr)
+        self.idle_workers.put_nowait(self._spawn_worker())
+
+    async def _next_worker(self):
+        while True:
+            worker = await self.idle_workers.get()
+            if not worker['dead']:
+                return worker
+
+    async def _batch_loop(self):
+        while True:
+            batch = [await self.pending.get()]
+            try:
+                await self._fill_and_dispatch(batch)
+            except Exception as e:
+                # Fail this batch only; the loop keeps serving the next ones
+                print(f"Batch dispatch failed: {type(e).__name__}: {e}", file=sys.stderr)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError(f"Batch dispatch failed: {e}"))
+
+    async def _fill_and_dispatch(self, batch):
+        """Wait for a live worker, top the batch up from the queue and send it"""
+        worker = await self._next_worker()
+        while len(batch) < self.max_batch_size and not self.pending.empty():
+            batch.append(self.pending.get_nowait())
+        # A lone request goes straight out; only under load is a batch topped up
+        if 1 < len(batch) < self.max_batch_size and self.max_wait > 0:
+            deadline = self.loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - self.loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+        self._dispatch(worker, batch)
+
+    def _dispatch(self, worker, batch):
+        batch_id = next(self.batch_ids)
+        worker['batch_id'] = batch_id
+        self.in_flight[batch_id] = [future for _, future in batch]
+        self.stats['batches'] += 1
+        self.stats['batched_requests'] += len(batch)
+        try:
+            worker['connection'].send((batch_id, [survey for survey, _ in batch]))
+        except (BrokenPipeError, OSError):
+            self._replace_worker(worker)
+
+    async def predict(self, survey_data):
+        """Answer one survey: table hit on the loop, otherwise via a worker batch"""
+        if not isinstance(survey_data, dict):
+            raise ValueError("Survey must be a JSON object")
+        self.stats['requests'] += 1
+        if not self.cascade:
+            answer_table = cached_answer_table()
+            result = lookup_answer_table(answer_table, survey_data) if answer_table else None
+            if result is not None:
+                self.stats['table_hits'] += 1
+                return result
+        future = self.loop.create_future()
+        self.pending.put_nowait((survey_data, future))
+        return await future
+
+    def report(self):
+        stats = dict(self.stats, workers=self.n_workers, queued=self.pending.qsize())
+        stats['mean_batch_size'] = stats['batched_requests'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+    async def handle_lines(self, reader, writer):
+        """Unix socket connection: newline-delimited --serve requests, answered in order"""
+        responses = asyncio.Queue()
+
+        async def answer(line):
+            request_id = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("Request must be a JSON object")
+                request_id = request.get('id')
+                if not isinstance(request.get('survey'), dict):
+                    raise ValueError("Request is missing the 'survey' object")
+                return {'id': request_id, 'result': await self.predict(request['survey'])}
+            except json.JSONDecodeError as e:
+                return {'id': request_id, 'error': f"Invalid JSON input: {e}"}
+            except Exception as e:
+                return {'id': request_id, 'error': f"Prediction error: {e}"}
+
+        async def write_responses():
+            while True:
+                task = await responses.get()
+                if task is None:
+                    break
+                writer.write((json.dumps(await task) + '\n').encode())
+                await writer.drain()
+
+        writing = asyncio.create_task(write_responses())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    responses.put_nowait(asyncio.create_task(answer(line)))
+            responses.put_nowait(None)
+            await writing
+        except ConnectionError:
+            writing.cancel()
+        finally:
+            writer.close()
+
+    async def handle_http(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive: POST /predict and GET /stats"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target = request_line.decode('latin-1').split()[:2]
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self.route(method, target, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, target, body):
+        if method == 'GET' and target == '/stats':
+            return '200 OK', self.report()
+        if method != 'POST' or target != '/predict':
+            return '404 Not Found', {'error': f"No route for {method} {target}"}
+        try:
+            survey_data = json.loads(body)
+        except json.JSONDecodeError as e:
+            return '400 Bad Request', {'error': f"Invalid JSON input: {e}"}
+        try:
+            return '200 OK', {'result': await self.predict(survey_data)}
+        except ValueError as e:
+            return '400 Bad Request', {'error': str(e)}
+        except Exception as e:
+            return '500 Internal Server Error', {'error': f"Prediction error: {e}"}
+
+async def run_service(args):
+    service = PredictionService(args.workers, args.max_batch_size, args.max_wait_ms, args.cascade)
+    await service.start()
+    if args.unix:
+        if os.path.exists(args.unix):
+            os.remove(args.unix)
+        server = await asyncio.start_unix_server(service.handle_lines, path=args.unix)
+        where = args.unix
+    else:
+        host, _, port = args.http.rpartition(':')
+        server = await asyncio.start_server(service.handle_http, host or '127.0.0.1', int(port))
+        where = f"http://{host or '127.0.0.1'}:{port}"
+    print(f"✅ Serving survey risk predictions on {where} with {service.n_workers} workers", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve survey risk predictions with micro-batching")
+    where = parser.add_mutually_exclusive_group(required=True)
+    where.add_argument('--http', metavar='HOST:PORT', help="listen for HTTP on a local address")
+    where.add_argument('--unix', metavar='PATH', help="listen on a Unix socket")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="longest a batch waits to fill up once requests are queuing")
+    parser.add_argument('--cascade', action='store_true', help="skip the table and run the model cascade")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_service(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
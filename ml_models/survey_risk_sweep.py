@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Parallel sensitivity sweep over the survey generator parameters
+Usage: python survey_risk_sweep.py [--noise-sigma 0.1 0.2 0.4] [--inconsistency-rate 0.05 0.1 0.2]
+                                   [--consistency-rate ...] [--edge-case-rate ...]
+                                   [--profile-weights "Young Aggressive=0.4,Conservative Retiree=0.1" ...]
+                                   [--grid grid.json] [--samples N] [--workers N] [--seed N]
+
+Every point of the grid (the product of all the value lists) is one
+generate -> train -> evaluate job: a dataset is generated with the point's
+parameters, every candidate model is trained on a stratified split and
+scored on the held-out rows. Jobs run in a process pool. Each point draws
+its data from a child of SeedSequence(seed) whose spawn key is a hash of
+the point's parameters, so points are independent, and a point reproduces
+exactly no matter which worker runs it or what else is in the grid.
+
+Each finished point is written to <cache dir>/<sha256 of the job inputs>.json,
+so an interrupted sweep resumes where it stopped and only new points run
+when the grid grows. All points end up in one results table (CSV), one row
+per point with its parameters, per-model accuracy and label shares.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+import warnings
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+warnings.filterwarnings('ignore')
+
+from survey_risk_dataset_cache import cache_key
+from survey_risk_registry import MODEL_DIR
+from survey_risk_schema import FEATURE_COLUMNS, CATEGORIES, LABEL_COLUMN
+from survey_risk_model import (
+    INVESTOR_PROFILES, NOISE_SIGMA, INCONSISTENCY_RATE, CONSISTENCY_RATE, EDGE_CASE_RATE,
+    DATASET_SEED, GENERATOR_VERSION, CANDIDATE_MODELS,
+    generate_survey_codes, build_candidate_models, fit_and_evaluate
+)
+
+SWEEP_CACHE_DIR = os.environ.get('SURVEY_RISK_SWEEP_CACHE', os.path.join(MODEL_DIR, '.sweep_cache'))
+SWEEP_RESULTS_PATH = os.path.join(MODEL_DIR, 'survey_risk_sweep.csv')
+DEFAULT_SWEEP_SAMPLES = 5000
+
+# Generator parameters a grid may vary, with their current values
+SCALAR_PARAMETERS = {
+    'noise_sigma': NOISE_SIGMA,
+    'inconsistency_rate': INCONSISTENCY_RATE,
+    'consistency_rate': CONSISTENCY_RATE,
+    'edge_case_rate': EDGE_CASE_RATE
+}
+
+def parse_profile_weights(text):
+    """'Profile=weight,Profile=weight' -> weight overrides (other profiles keep theirs)"""
+    known = {profile['profile'] for profile in INVESTOR_PROFILES}
+    weights = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, value = item.rpartition('=')
+        if name not in known:
+            raise ValueError(f"Unknown investor profile {name!r}; expected one of {sorted(known)}")
+        weights[name] = float(value)
+    return weights
+
+def sweep_points(grid):
+    """Expand a grid (parameter -> list of values) into point dicts, in a fixed order"""
+    names = [name for name in list(SCALAR_PARAMETERS) + ['profile_weights'] if name in grid]
+    unknown = set(grid) - set(names)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters {sorted(unknown)}")
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def generator_params(point):
+    """Keyword arguments for generate_survey_codes at one sweep point"""
+    params = {name: point.get(name, default) for name, default in SCALAR_PARAMETERS.items()}
+    overrides = point.get('profile_weights') or {}
+    params['profiles'] = [
+        dict(profile, weight=overrides.get(profile['profile'], profile['weight']))
+        for profile in INVESTOR_PROFILES
+    ]
+    return params
+
+def run_point(job):
+    """Generate, train and evaluate one sweep point; returns its result row"""
+    point, seed_sequence, n_samples = job['point'], job['seed_sequence'], job['n_samples']
+    started = time.perf_counter()
+    codes = generate_survey_codes(n_samples, np.random.default_rng(seed_sequence), **generator_params(point))
+
+    X = np.column_stack([codes[column] for column in FEATURE_COLUMNS])
+    y = np.array(CATEGORIES[LABEL_COLUMN], dtype=object)[codes[LABEL_COLUMN]]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    row = dict(point, profile_weights=json.dumps(point.get('profile_weights') or {}, sort_keys=True),
+               key=job['key'], samples=n_samples)
+    label_counts = np.bincount(codes[LABEL_COLUMN], minlength=len(CATEGORIES[LABEL_COLUMN]))
+    for label, count in zip(CATEGORIES[LABEL_COLUMN], label_counts):
+        row[f'share_{label}'] = float(count / n_samples)
+
+    accuracies = {}
+    for name, model in build_candidate_models().items():
+        _, accuracy, model_timing = fit_and_evaluate(model, X_train, y_train, X_test, y_test)
+        accuracies[name] = accuracy
+        row[f'accuracy_{name}'] = accuracy
+        row[f'fit_seconds_{name}'] = model_timing['fit_seconds']
+    row['best_model'] = max(accuracies, key=accuracies.get)
+    row['best_accuracy'] = accuracies[row['best_model']]
+    row['seconds'] = time.perf_counter() - started
+
+    # Written by the worker as soon as the point is done, so a crash loses nothing
+    save_point(job['key'], row, job['cache_dir'])
+    return row
+
+def point_path(key, cache_dir=SWEEP_CACHE_DIR):
+    return os.path.join(cache_dir, f"{key}.json")
+
+def load_point(key, cache_dir=SWEEP_CACHE_DIR):
+    """A finished point's result row, or None if it has not run yet"""
+    try:
+        with open(point_path(key, cache_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Rerunning unreadable sweep point {key[:12]}: {e}", file=sys.stderr)
+        return None
+
+def save_point(key, row, cache_dir=SWEEP_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = point_path(key, cache_dir)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(row, f)
+    os.replace(temp_path, path)
+
+def run_sweep(grid, n_samples=DEFAULT_SWEEP_SAMPLES, seed=DATASET_SEED, n_workers=None,
+              cache_dir=SWEEP_CACHE_DIR, results_path=SWEEP_RESULTS_PATH):
+    """Run every grid point not already cached and return all points as one table"""
+    points = sweep_points(grid)
+    jobs = []
+    rows = [None] * len(points)
+    for index, point in enumerate(points):
+        # Keyed by the parameters rather than the grid position, so growing
+        # the grid leaves every existing point's seed (and cache entry) alone
+        point_id = cache_key(generator_params(point))
+        child = np.random.SeedSequence(seed, spawn_key=(int(point_id[:8], 16),))
+        key = cache_key({
+            'generator_version': GENERATOR_VERSION,
+            'generator_params': generator_params(point),
+            'n_samples': n_samples,
+            'seed': seed,
+            'spawn_key': list(child.spawn_key),
+            'candidates': {name: defaults for name, (_, defaults) in CANDIDATE_MODELS.items()}
+        })
+        rows[index] = load_point(key, cache_dir)
+        if rows[index] is None:
+            jobs.append((index, {'point': point, 'seed_sequence': child, 'n_samples': n_samples,
+                                 'key': key, 'cache_dir': cache_dir}))
+
+    print(f"Sweeping {len(points)} points ({len(points) - len(jobs)} cached, {len(jobs)} to run) "
+          f"with {n_samples} samples each...")
+    started = time.perf_counter()
+    if jobs:
+        n_workers = max(1, min(n_workers or os.cpu_count() or 1, len(jobs)))
+        with multiprocessing.get_context().Pool(n_workers) as pool:
+            results = pool.imap_unordered(_run_indexed, jobs)
+            for done, (index, row) in enumerate(results, 1):
+                rows[index] = row
+                print(f"  [{done}/{len(jobs)}] {describe_point(points[index])}: "
+                      f"{row['best_model']} {row['best_accuracy']:.3f} ({row['seconds']:.1f}s)")
+
+    table = pd.DataFrame(rows)
+    temp_path = f"{results_path}.tmp"
+    table.to_csv(temp_path, index=False)
+    os.replace(temp_path, results_path)
+    print(f"✅ {len(table)} sweep points in {time.perf_counter() - started:.1f}s, table saved to {results_path}")
+    return table
+
+def _run_indexed(indexed_job):
+    index, job = indexed_job
+    return index, run_point(job)
+
+def describe_point(point):
+    return ', '.join(f"{name}={value}" for name, value in point.items())
+
+def print_sensitivity(table):
+    """Spread of the best accuracy over each swept parameter's values"""
+    print("\n📊 Best accuracy by parameter value (mean over the other parameters):")
+    for name in [name for name in list(SCALAR_PARAMETERS) + ['profile_weights'] if name in table]:
+        if table[name].nunique() < 2:
+            continue
+        summary = table.groupby(name, sort=True)['best_accuracy'].agg(['mean', 'min', 'max'])
+        print(f"{name}:")
+        for value, stats in summary.iterrows():
+            print(f"  {value}: {stats['mean']:.3f} (min {stats['min']:.3f}, max {stats['max']:.3f})")
+    print(f"\nOverall: {table['best_accuracy'].min():.3f} - {table['best_accuracy'].max():.3f} best accuracy")
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain and evaluate across generator parameter variants")
+    parser.add_argument('--grid', help="JSON file mapping parameters to lists of values "
+                                       "(profile_weights values are {profile: weight} objects)")
+    for name, default in SCALAR_PARAMETERS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, nargs='+', metavar='VALUE',
+                            help=f"values to sweep (default: {default})")
+    parser.add_argument('--profile-weights', action='append', metavar='PROFILE=WEIGHT,...',
+                        help="one investor profile weight variant to sweep; repeat for more")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SWEEP_SAMPLES, help="rows generated per point")
+    parser.add_argument('--seed', type=int, default=DATASET_SEED)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--cache-dir', default=SWEEP_CACHE_DIR)
+    parser.add_argument('--output', default=SWEEP_RESULTS_PATH, help="CSV path for the results table")
+    args = parser.parse_args()
+
+    grid = {}
+    if args.grid:
+        with open(args.grid) as f:
+            grid.update(json.load(f))
+    for name in SCALAR_PARAMETERS:
+        if getattr(args, name) is not None:
+            grid[name] = getattr(args, name)
+    if args.profile_weights:
+        grid['profile_weights'] = [parse_profile_weights(text) for text in args.profile_weights]
+    if not grid:
+        parser.error("nothing to sweep; give --grid or at least one parameter's values")
+
+    table = run_sweep(grid, args.samples, args.seed, args.workers, args.cache_dir, args.output)
+    print_sensitivity(table)
+
+if __name__ == "__main__":
+    main()
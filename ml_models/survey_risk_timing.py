@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Opt-in stage timing for survey risk predictions and training
+Enable with SURVEY_RISK_TIMINGS=field (add a 'timings' field to outputs) or
+SURVEY_RISK_TIMINGS=stderr (write one JSON line per record to stderr).
+Outputs without room for an extra field (--batch rows, training) always
+report on stderr.
+
+Code marks stages with `with timed('encode'):`. When timing is off, timed()
+hands back one shared no-op context, so instrumented code pays only a
+function call. When on, every stage duration (high-resolution perf_counter_ns,
+reported in ms) is added to the current record and to a rolling window per
+stage, from which long-running processes report p50/p95/p99.
+"""
+
+import os
+import sys
+import json
+import time
+import contextlib
+from collections import deque
+
+MODES = ('field', 'stderr')
+ROLLING_WINDOW = 2048
+
+_mode = None
+_current = None
+_windows = {}
+_DISABLED = contextlib.nullcontext()
+
+def enable(mode='field'):
+    """Turn timing on ('field' or 'stderr'), or off with None"""
+    global _mode
+    if mode is not None and mode not in MODES:
+        raise ValueError(f"Unknown timing mode: {mode}")
+    _mode = mode
+
+def enabled():
+    return _mode is not None
+
+def mode():
+    return _mode
+
+class _Stage:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, (time.perf_counter_ns() - self.started) / 1e6)
+        return False
+
+def timed(stage):
+    """Context manager timing one stage; a shared no-op when timing is off"""
+    if _mode is None:
+        return _DISABLED
+    return _Stage(stage)
+
+def record(stage, ms):
+    """Add a measured duration to the current record and the rolling window"""
+    if _mode is None:
+        return
+    if _current is not None:
+        _current[stage] = _current.get(stage, 0.0) + ms
+    window = _windows.get(stage)
+    if window is None:
+        window = _windows[stage] = deque(maxlen=ROLLING_WINDOW)
+    window.append(ms)
+
+def begin():
+    """Start collecting stage timings for one request or job"""
+    global _current
+    if _mode is not None:
+        _current = {}
+
+def end():
+    """Finish the current record and return its timings (None when off)"""
+    global _current
+    timings, _current = _current, None
+    return timings
+
+def emit(timings, force=False, **context):
+    """Write a finished record to stderr in 'stderr' mode (or whenever force is set)"""
+    if timings is not None and (_mode == 'stderr' or force):
+        print(json.dumps(dict(context, timings=timings)), file=sys.stderr)
+
+def percentiles():
+    """Rolling p50/p95/p99 (nearest rank) per stage over the recent window"""
+    report = {}
+    for stage, window in _windows.items():
+        samples = sorted(window)
+        if not samples:
+            continue
+        rank = lambda q: samples[min(len(samples) - 1, max(0, int(round(q * len(samples))) - 1))]
+        report[stage] = {
+            'count': len(samples),
+            'p50': rank(0.50),
+            'p95': rank(0.95),
+            'p99': rank(0.99)
+        }
+    return report
+
+def reset():
+    """Forget all rolling samples"""
+    _windows.clear()
+
+def enable_from_env():
+    """Apply SURVEY_RISK_TIMINGS, ignoring (with a warning) values it does not know"""
+    mode = os.environ.get('SURVEY_RISK_TIMINGS') or None
+    # A typo in an opt-in diagnostics flag must not take the predictor down
+    if mode is not None and mode not in MODES:
+        print(f"⚠️  Ignoring SURVEY_RISK_TIMINGS={mode!r}; expected one of {', '.join(MODES)}", file=sys.stderr)
+        mode = None
+    enable(mode)
+
+enable_from_env()
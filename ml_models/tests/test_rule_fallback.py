@@ -0,0 +1,66 @@
+"""The table-driven rule fallback scores like the original if/elif rules"""
+
+import itertools
+
+import pytest
+
+from predict_survey_risk import rule_based_prediction
+from survey_risk_schema import CATEGORIES
+
+
+def original_risk_score(survey_data):
+    # The rules as first written in fallback_prediction
+    risk_score = 0
+    risk = survey_data.get('risk', 'Medium')
+    if risk == 'High':
+        risk_score += 4
+    elif risk == 'Medium':
+        risk_score += 2
+    experience = survey_data.get('experience', 'Intermediate')
+    if experience == 'Advanced':
+        risk_score += 2.5
+    elif experience == 'Intermediate':
+        risk_score += 1.25
+    duration = survey_data.get('investmentDuration', 'Medium-term (3-7 years)')
+    if 'Long-term' in duration:
+        risk_score += 2
+    elif 'Medium-term' in duration:
+        risk_score += 1
+    goal = survey_data.get('goal', 'Wealth Growth')
+    if goal == 'Wealth Growth':
+        risk_score += 1.5
+    elif goal == 'Passive Income':
+        risk_score += 0.75
+    return risk_score
+
+
+def original_risk_level(survey_data):
+    risk_score = original_risk_score(survey_data)
+    if risk_score >= 6.0:
+        return 'High'
+    if risk_score >= 3.0:
+        return 'Moderate'
+    return 'Low'
+
+
+COLUMNS = ('risk', 'experience', 'investmentDuration', 'goal')
+
+
+def test_every_schema_combination_matches_original_rules():
+    for values in itertools.product(*(CATEGORIES[column] for column in COLUMNS)):
+        survey_data = dict(zip(COLUMNS, values))
+        assert rule_based_prediction(survey_data)['predicted_risk'] == original_risk_level(survey_data), survey_data
+
+
+@pytest.mark.parametrize('survey_data', [
+    {},
+    {'risk': 'High'},
+    # Keyword durations push these over a threshold
+    {'risk': 'Medium', 'experience': 'Beginner', 'investmentDuration': 'Long-term', 'goal': 'Retirement'},
+    {'risk': 'Medium', 'experience': 'Advanced', 'investmentDuration': 'Long-term (10+ years)', 'goal': 'Retirement'},
+    {'risk': 'Low', 'experience': 'Intermediate', 'investmentDuration': 'Medium-term', 'goal': 'Passive Income'},
+    {'risk': 'Medium', 'experience': 'Beginner', 'investmentDuration': 'Short-term'},
+    {'risk': 'high', 'experience': 'expert', 'investmentDuration': '', 'goal': 'Retirement'},
+])
+def test_off_schema_answers_match_original_rules(survey_data):
+    assert rule_based_prediction(survey_data)['predicted_risk'] == original_risk_level(survey_data)
@@ -0,0 +1,20 @@
+"""Cold-start budget of a one-shot table prediction (see predict_survey_risk.py --check-startup)"""
+
+import pytest
+
+from predict_survey_risk import HEAVY_MODULES, STARTUP_BUDGET_MS, measure_startup
+
+
+@pytest.fixture(scope='module')
+def startup_report():
+    # First run only writes __pycache__; a deployed predictor starts from compiled bytecode
+    measure_startup()
+    return measure_startup()
+
+
+def test_cold_prediction_stays_within_import_budget(startup_report):
+    assert startup_report['import_ms'] <= STARTUP_BUDGET_MS, startup_report
+
+
+def test_cold_prediction_imports_no_heavy_modules(startup_report):
+    assert not set(startup_report['heavy_modules']) & set(HEAVY_MODULES), startup_report